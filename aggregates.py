@@ -0,0 +1,183 @@
+"""Process-wide weekly statistics per city and vehicle, shared by every session"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from rates import normalize
+
+METRICS = ("distance", "cost", "emission")
+# Weeks kept in memory, least recently used dropped first
+ROLLING_WEEKS = 8
+# Independent locks per week; riders and groups hash onto them
+LOCK_STRIPES = 16
+
+
+class Sketch:
+    """Log-bucketed histogram with quantiles within ACCURACY relative error
+
+    Counts live in a fixed-size array, so merging is one addition and a
+    quantile is one cumulative sum over a constant number of buckets, however
+    many values were added. Values can be removed again.
+    """
+
+    ACCURACY = 0.02
+    MIN_VALUE = 1e-2
+    MAX_VALUE = 1e9
+    GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    OFFSET = math.floor(math.log(MIN_VALUE) / math.log(GAMMA))
+    # Bucket 0 holds zeros (and anything below MIN_VALUE)
+    BUCKETS = math.ceil(math.log(MAX_VALUE) / math.log(GAMMA)) - OFFSET + 1
+
+    def __init__(self):
+        self.counts = np.zeros(self.BUCKETS, dtype=np.int64)
+        self.count = 0
+
+    def bucket(self, value):
+        if value < self.MIN_VALUE:
+            return 0
+        index = math.ceil(math.log(value) / math.log(self.GAMMA)) - self.OFFSET
+        return min(max(index, 1), self.BUCKETS - 1)
+
+    def value(self, bucket):
+        """Representative value of a bucket, within ACCURACY of everything in it"""
+        if bucket == 0:
+            return 0.0
+        return 2 * self.GAMMA ** (bucket + self.OFFSET) / (self.GAMMA + 1)
+
+    def add(self, value, count=1):
+        """Add `count` copies of value; a negative count removes them"""
+        self.counts[self.bucket(value)] += count
+        self.count += count
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        self.counts += other.counts
+        self.count += other.count
+
+    def quantile(self, q):
+        """Approximate q-quantile, NaN when empty"""
+        if not self.count:
+            return math.nan
+        cumulative = np.cumsum(self.counts)
+        return self.value(int(np.searchsorted(cumulative, q * (self.count - 1), side="right")))
+
+    def rank(self, value):
+        """Share of the other values below value, ties counted half; None if there are none"""
+        if self.count < 2:
+            return None
+        bucket = self.bucket(value)
+        below = int(self.counts[:bucket].sum())
+        return (below + (self.counts[bucket] - 1) / 2) / (self.count - 1)
+
+
+class GroupStats:
+    """Rider count, totals and a sketch per metric for one city, vehicle or everyone"""
+
+    def __init__(self):
+        self.riders = 0
+        self.sums = dict.fromkeys(METRICS, 0.0)
+        self.sketches = {name: Sketch() for name in METRICS}
+
+    def add(self, values, sign=1):
+        self.riders += sign
+        for name, value in zip(METRICS, values):
+            self.sums[name] += sign * value
+            self.sketches[name].add(value, sign)
+
+    def summary(self, values):
+        """Mean, median, 90th percentile and the rider's rank for each metric"""
+        summary = {"riders": self.riders}
+        for name, value in zip(METRICS, values):
+            sketch = self.sketches[name]
+            summary[name] = {
+                "mean": self.sums[name] / self.riders if self.riders else math.nan,
+                "median": sketch.quantile(0.5),
+                "p90": sketch.quantile(0.9),
+                "rank": sketch.rank(value)
+            }
+        return summary
+
+
+class WeekStats:
+    """Every rider's committed totals for one week, grouped by city and vehicle"""
+
+    def __init__(self):
+        self._rider_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._group_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._riders = {}
+        self._groups = {}
+
+    def commit(self, rider, city, vehicle, totals):
+        """Record a rider's totals for the week, replacing what they committed before"""
+        groups = self._group_keys(city, vehicle)
+        values = tuple(float(totals[name]) for name in METRICS)
+        # Rider lock first, then group locks, always in that order
+        with self._rider_locks[hash(rider) % LOCK_STRIPES]:
+            previous = self._riders.get(rider)
+            if previous == (groups, values):
+                return
+            self._riders[rider] = (groups, values)
+            if previous is not None:
+                self._update(*previous, sign=-1)
+            self._update(groups, values)
+
+    def discard(self, rider):
+        """Drop a rider's totals for the week, e.g. after they cleared every trip"""
+        with self._rider_locks[hash(rider) % LOCK_STRIPES]:
+            previous = self._riders.pop(rider, None)
+            if previous is not None:
+                self._update(*previous, sign=-1)
+
+    def compare(self, city, vehicle, totals):
+        """Group summaries for everyone, the city and the vehicle, ranked against these totals"""
+        values = tuple(float(totals[name]) for name in METRICS)
+        comparison = {}
+        for dimension, key in zip(("all", "city", "vehicle"), self._group_keys(city, vehicle)):
+            with self._group_locks[hash(key) % LOCK_STRIPES]:
+                group = self._groups.get(key) or GroupStats()
+                comparison[dimension] = group.summary(values)
+        return comparison
+
+    def _group_keys(self, city, vehicle):
+        return (("all", ""), ("city", normalize(city)), ("vehicle", normalize(vehicle)))
+
+    def _update(self, groups, values, sign=1):
+        for key in groups:
+            with self._group_locks[hash(key) % LOCK_STRIPES]:
+                group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = GroupStats()
+                group.add(values, sign)
+
+
+class AggregateService:
+    """Thread-safe cache of WeekStats for the most recently used weeks"""
+
+    def __init__(self, weeks=ROLLING_WEEKS):
+        self.weeks = weeks
+        self._lock = threading.Lock()
+        self._weeks = OrderedDict()
+
+    def week(self, week_start, load=None):
+        """WeekStats for a week; a new week is first filled from load(week_start)
+
+        load returns columns user_id, city, vehicle, distance, cost and
+        emission, e.g. TravelRepository.week_totals_by_rider. Loading happens
+        once per week under the service lock.
+        """
+        with self._lock:
+            stats = self._weeks.get(week_start)
+            if stats is not None:
+                self._weeks.move_to_end(week_start)
+                return stats
+            stats = self._weeks[week_start] = WeekStats()
+            if load is not None:
+                columns = load(week_start)
+                for rider, city, vehicle, *values in zip(*(columns[name] for name in
+                                                           ("user_id", "city", "vehicle") + METRICS)):
+                    stats.commit(int(rider), city, vehicle, dict(zip(METRICS, values)))
+            while len(self._weeks) > self.weeks:
+                self._weeks.popitem(last=False)
+            return stats
@@ -0,0 +1,131 @@
+"""Display-free stand-ins for the tkinter pieces code1.py uses
+
+Benchmarks call `install()` before importing code1 when no display is
+available. Widgets accept any configuration and do nothing, except Treeview,
+which keeps real item order so render/insert/delete costs are measured, and
+FigureCanvasTkAgg, which renders with Agg so chart drawing is measured too.
+"""
+import sys
+import types
+
+
+class Widget:
+    """Accepts any constructor arguments and method calls"""
+
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def configure(self, **kwargs):
+        self.options.update(kwargs)
+
+    config = configure
+
+    def cget(self, key):
+        return self.options.get(key)
+
+
+class Entry(Widget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = ""
+
+    def get(self):
+        return self.value
+
+    def insert(self, index, text):
+        self.value = self.value[:index] + text if index != "end" else self.value + text
+
+    def delete(self, first, last=None):
+        self.value = ""
+
+
+class Treeview(Widget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.order = []
+        self.values = {}
+        self.selected = ()
+
+    def get_children(self, item=""):
+        return tuple(self.order)
+
+    def exists(self, iid):
+        return iid in self.values
+
+    def insert(self, parent, index, iid=None, values=(), **kwargs):
+        self.order.insert(len(self.order) if index == "end" else index, iid)
+        self.values[iid] = values
+        return iid
+
+    def move(self, iid, parent, index):
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.order.remove(iid)
+            del self.values[iid]
+
+    def selection(self):
+        return self.selected
+
+
+class Style(Widget):
+    def lookup(self, *args, **kwargs):
+        return ""
+
+
+class Tk(Widget):
+    def after(self, delay, callback=None, *args):
+        # No event loop: pending callbacks are dropped, callers poll explicitly
+        return None
+
+
+def install():
+    """Register the stand-ins as tkinter and the matplotlib TkAgg backend"""
+    tk = types.ModuleType("tkinter")
+    ttk = types.ModuleType("tkinter.ttk")
+    messagebox = types.ModuleType("tkinter.messagebox")
+    filedialog = types.ModuleType("tkinter.filedialog")
+
+    tk.Tk = Tk
+    tk.Entry = Entry
+    tk.TclError = RuntimeError
+    for name in ("Frame", "Label", "Button", "Toplevel", "Text", "StringVar", "BooleanVar", "IntVar"):
+        setattr(tk, name, Widget)
+    ttk.Treeview = Treeview
+    ttk.Style = Style
+    for name in ("Frame", "LabelFrame", "Button", "Label", "Scrollbar", "Checkbutton", "Combobox"):
+        setattr(ttk, name, Widget)
+    for name in ("showerror", "showwarning", "showinfo"):
+        setattr(messagebox, name, lambda *args, **kwargs: None)
+    messagebox.askyesno = lambda *args, **kwargs: True
+    filedialog.askopenfilename = lambda **kwargs: ""
+    filedialog.asksaveasfilename = lambda **kwargs: ""
+
+    tk.ttk, tk.messagebox, tk.filedialog = ttk, messagebox, filedialog
+    sys.modules.update({
+        "tkinter": tk,
+        "tkinter.ttk": ttk,
+        "tkinter.messagebox": messagebox,
+        "tkinter.filedialog": filedialog
+    })
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    class FigureCanvasTkAgg(FigureCanvasAgg):
+        def __init__(self, figure, master=None):
+            super().__init__(figure)
+
+        def get_tk_widget(self):
+            return Widget()
+
+        def draw_idle(self, *args, **kwargs):
+            self.draw()
+
+    backend = types.ModuleType("matplotlib.backends.backend_tkagg")
+    backend.FigureCanvasTkAgg = FigureCanvasTkAgg
+    sys.modules["matplotlib.backends.backend_tkagg"] = backend
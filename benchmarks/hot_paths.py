@@ -0,0 +1,286 @@
+"""Hot-path benchmarks for both apps on synthetic histories
+
+Generates histories from 1k up to 10M records and times the interactive hot
+paths of code1.py (Tk, headless when there is no display) and code.py
+(Streamlit helpers, plus full reruns through streamlit.testing's AppTest).
+Reports p50/p95/p99 latency and peak traced memory, and can save or compare
+against a baseline file.
+
+    python benchmarks/hot_paths.py --sizes 1000 100000 1000000
+    python benchmarks/hot_paths.py --save-baseline
+    python benchmarks/hot_paths.py --compare
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import date, datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import numpy as np  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+REGRESSION_RATIO = 1.5
+# Sub-millisecond paths jitter by more than 1.5x; ignore slowdowns smaller than this
+REGRESSION_MIN_MS = 0.5
+
+
+def synthetic_history(n, seed=0):
+    """Column chunk of n trips spread over roughly n/3 days (at least a year)"""
+    rng = np.random.default_rng(seed)
+    span = max(365, n // 3)
+    dates = np.datetime64("2015-01-01") + np.sort(rng.integers(0, span, n))
+    distance = np.round(rng.gamma(2.0, 8.0, n) + 0.5, 1)
+    cost = np.round(distance * rng.uniform(2.5, 4.0, n), 2)
+    return {
+        "date": dates,
+        "distance": distance,
+        "cost": cost,
+        "emission": distance * 125,
+        "destination": rng.choice(np.array(["Office", "Market", "Gym", "Station"], dtype=object), n)
+    }
+
+
+def measure(fn, repeat, setup=None):
+    """Latency percentiles (ms) over `repeat` runs plus peak traced memory (MiB) of one run"""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "p50": statistics.median(times),
+        "p95": times[min(len(times) - 1, int(0.95 * len(times)))],
+        "p99": times[min(len(times) - 1, int(0.99 * len(times)))],
+        "peak_mib": peak / 2**20
+    }
+
+
+def import_code1():
+    """Import code1 against real Tk when a display is available, headless otherwise"""
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+    except Exception:
+        from benchmarks import headless_tk
+        headless_tk.install()
+
+    import code1
+    code1.messagebox.askyesno = lambda *args, **kwargs: True
+    code1.messagebox.showinfo = lambda *args, **kwargs: None
+    return code1
+
+
+def bench_tk(code1, n, repeat, workdir):
+    """load_data/save_data, render, add, delete, quality check and prediction of the Tk app"""
+    from journal import TravelJournal
+
+    history = synthetic_history(n)
+    os.chdir(workdir)
+    for name in os.listdir(workdir):
+        os.remove(name)
+    journal = TravelJournal("travel_data.trv", fsync=False)
+    journal.append_batch({name: history[name] for name in ("date", "distance", "cost")})
+    journal.compact(journal.load())
+    journal.close()
+
+    app = code1.TravelPredictionApp(code1.tk.Tk())
+    warnings.filterwarnings("ignore", message="Creating legend")
+    results = {
+        "load_data": measure(app.load_data, max(3, repeat // 10)),
+        "save_data (compaction)": measure(
+            lambda: app.journal.compact(app.travel_data), max(3, repeat // 10)
+        ),
+        "render_travel_data": measure(app.render_travel_data, repeat)
+    }
+
+    rng = np.random.default_rng(1)
+
+    def fill_form():
+        app.date_entry.delete(0, "end")
+        app.date_entry.insert(0, str(history["date"][rng.integers(n)]))
+        app.distance_entry.insert(0, "12.5")
+        app.cost_entry.insert(0, "40")
+
+    results["add_travel_record"] = measure(app.add_travel_record, repeat, setup=fill_form)
+
+    def select_random():
+        record_id = int(app.travel_data["id"][rng.integers(len(app.travel_data))])
+        app.tree.selection = lambda: (str(record_id),)
+
+    results["delete_record"] = measure(lambda: app.delete_record(None), repeat, setup=select_random)
+
+    today = datetime.now()
+    inputs = {
+        "today": today,
+        "first_day": app.index.first_day,
+        "days": app.index.days(),
+        "distance": app.travel_data["distance"][app.travel_data.rows(app.index.ids())],
+        "total_distance": app.travel_data.total("distance"),
+        "total_cost": app.travel_data.total("cost"),
+        "recent_trips": 0,
+        "recent_distance": 0.0,
+        "model": app.model
+    }
+    results["predict (fit step)"] = measure(lambda: app.compute_prediction(**inputs), repeat)
+    results["predict (robust fit)"] = measure(
+        lambda: app.compute_prediction(robust=True, **inputs), max(3, repeat // 10)
+    )
+    results["check_quality"] = measure(app.check_quality, max(3, repeat // 10))
+
+    def predict_and_draw():
+        app.predict_future_travel()
+        app.prediction_job.result()
+        app.poll_prediction()
+
+    results["predict_future_travel + chart"] = measure(predict_and_draw, max(3, repeat // 5))
+    app.journal.close()
+    app.executor.shutdown()
+    return results
+
+
+def bench_streamlit(n, repeat, workdir):
+    """Rollup building and reads, DataFrame and chart building, and full AppTest reruns of code.py"""
+    import weekly_report
+    from rollups import Rollups
+    from travel_repository import TravelRepository
+
+    os.chdir(workdir)
+    for name in os.listdir(workdir):
+        os.remove(name)
+    repository = TravelRepository("travel_tracker.db")
+    user_id = repository.get_or_create_user("Bench", 30, "Shine125", "Mumbai")
+    history = synthetic_history(n)
+    for start in range(0, n, 100_000):
+        repository.import_trips(user_id, {name: values[start:start + 100_000] for name, values in history.items()})
+
+    week_start = date(2015, 1, 5)
+    week = repository.load_week(user_id, week_start)
+
+    def build_rollups():
+        rollups = Rollups()
+        for chunk in repository.iter_trips(user_id):
+            rollups.add(chunk["date"].astype(np.int64), chunk)
+        return rollups
+
+    rollups = build_rollups()
+    first_day = np.datetime64(week_start, "D").astype(np.int64)
+    results = {
+        "build rollups": measure(build_rollups, max(3, repeat // 10)),
+        "weekly totals (rollups)": measure(lambda: rollups.totals(first_day, first_day + 6), repeat),
+        "history chart (rollups)": measure(
+            lambda: weekly_report.history_chart(*weekly_report.history_table(rollups)), max(3, repeat // 5)
+        ),
+        "load_week": measure(lambda: repository.load_week(user_id, week_start), repeat),
+        "travel_log DataFrame": measure(lambda: weekly_report.travel_log(week), repeat),
+        "charts": measure(
+            lambda: (weekly_report.distance_chart(week), weekly_report.cost_emission_chart(week)), repeat
+        )
+    }
+    repository.close()
+
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return results
+
+    # Keep per-rerun deprecation warnings out of the report
+    logging.disable(logging.WARNING)
+
+    at = AppTest.from_file(os.path.join(REPO, "code.py"), default_timeout=120).run()
+    at.text_input[0].input("Bench")
+    at.text_input[1].input("Shine125")
+    at.text_input[2].input("Mumbai")
+    at.button[0].click().run()
+    at.sidebar.date_input[0].set_value(week_start).run()
+    results["AppTest rerun"] = measure(at.run, max(3, repeat // 5))
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def print_results(size, group, results, baseline):
+    print(f"\n{group} @ {size:,} records")
+    print(f"  {'path':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MiB':>10}  vs baseline")
+    regressions = []
+    for path, stats in results.items():
+        key = f"{group}/{path}@{size}"
+        line = f"  {path:<32}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['peak_mib']:>10.1f}"
+        if baseline and key in baseline:
+            previous = baseline[key]["p50"]
+            ratio = stats["p50"] / max(previous, 1e-6)
+            line += f"  {ratio:5.2f}x"
+            if ratio > REGRESSION_RATIO and stats["p50"] - previous > REGRESSION_MIN_MS:
+                line += "  REGRESSION"
+                regressions.append(key)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--only", choices=("tk", "streamlit"))
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE}")
+    parser.add_argument("--compare", action="store_true", help="compare p50 against the baseline file")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare and os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    code1 = import_code1() if args.only != "streamlit" else None
+    collected = {}
+    regressions = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for size in args.sizes:
+                groups = []
+                if args.only != "streamlit":
+                    groups.append(("tk", bench_tk(code1, size, args.repeat, workdir)))
+                if args.only != "tk":
+                    groups.append(("streamlit", bench_streamlit(size, args.repeat, workdir)))
+                for group, results in groups:
+                    regressions += print_results(size, group, results, baseline)
+                    collected.update({f"{group}/{path}@{size}": stats for path, stats in results.items()})
+        finally:
+            os.chdir(cwd)
+
+    if args.save_baseline:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": collected
+            }, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {BASELINE}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {REGRESSION_RATIO}x baseline p50")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
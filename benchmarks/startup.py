@@ -0,0 +1,84 @@
+"""Startup import-time benchmark for both entry points
+
+Runs each entry point's first screen in a fresh interpreter under
+`python -X importtime`, reports the total import time and the heaviest
+top-level packages, and fails if a deferred dependency is loaded at startup.
+
+    python benchmarks/startup.py [--repeat 5] [--max-ms 1500]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What "startup" means for each app: import the Tk module (without entering
+# mainloop), or run the Streamlit script in bare mode, which renders the
+# "User Information" setup page
+ENTRY_POINTS = {
+    "code1.py (Tk)": "import code1",
+    "code.py (Streamlit)": "import runpy; runpy.run_path('code.py', run_name='__streamlit__')",
+}
+
+# Modules that the first screen of either app must not load (Streamlit itself
+# imports the bare `plotly` package, so the check names plotly's heavy parts)
+DEFERRED = ("matplotlib", "sklearn", "pandas", "plotly.express", "plotly.graph_objs", "pyarrow")
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def measure(statement):
+    """Per-package import times (µs) and all module names for one cold interpreter run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=REPO, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr[-2000:])
+
+    # Summing each module's self time per top-level package attributes nested
+    # imports (e.g. matplotlib pulled in by code1) to the package that costs it
+    packages = {}
+    modules = set()
+    for match in IMPORT_LINE.finditer(result.stderr):
+        self_time, _, name = match.groups()
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0) + int(self_time)
+        modules.add(name)
+    return packages, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="cold runs per entry point")
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list")
+    parser.add_argument("--max-ms", type=float, help="fail if median total import time exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    for label, statement in ENTRY_POINTS.items():
+        runs = [measure(statement) for _ in range(args.repeat)]
+        totals = [sum(packages.values()) / 1000 for packages, _ in runs]
+        median_ms = statistics.median(totals)
+        print(f"{label}: median {median_ms:.1f} ms, min {min(totals):.1f} ms over {args.repeat} runs")
+
+        packages, modules = runs[-1]
+        for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<24} {micros / 1000:8.1f} ms")
+
+        loaded = [name for name in DEFERRED if name in modules]
+        if loaded:
+            print(f"    FAIL: loaded at startup: {', '.join(loaded)}")
+            failed = True
+        if args.max_ms is not None and median_ms > args.max_ms:
+            print(f"    FAIL: median exceeds {args.max_ms:.0f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
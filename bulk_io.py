@@ -0,0 +1,253 @@
+"""Streaming bulk import and export of travel records (CSV and Parquet)"""
+import csv
+import math
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+REQUIRED_COLUMNS = ("date", "distance", "cost")
+OPTIONAL_COLUMNS = ("emission", "destination")
+CHUNK_SIZE = 100_000
+
+
+def parse_record(date_text, distance_text, cost_text):
+    """Validate one record with the rules used by the Tk entry form"""
+    date = datetime.strptime(date_text.strip(), "%Y-%m-%d")
+    distance = float(distance_text)
+    cost = float(cost_text)
+
+    if not (0 < distance < math.inf and 0 < cost < math.inf):
+        raise ValueError("Values must be positive")
+    return date, distance, cost
+
+
+def raise_error(line, row, error):
+    """Default CSV error handler: stop at the first invalid row"""
+    raise ValueError(f"line {line}: {error}")
+
+
+def raise_row_error(number, row, error):
+    """Default Parquet error handler: stop at the first invalid row"""
+    raise ValueError(f"row {number}: {error}")
+
+
+def read_csv(source, chunk_size=CHUNK_SIZE, on_error=raise_error):
+    """Stream validated column chunks from a CSV with date, distance and cost columns
+
+    `source` is a path or an open text file. Each chunk is a dict of NumPy
+    arrays; rows that fail validation are passed to on_error(line, row, error)
+    and left out.
+    """
+    f = open(source, newline="", encoding="utf-8") if isinstance(source, str) else source
+    try:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        missing = [name for name in REQUIRED_COLUMNS if name not in header]
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+        positions = {
+            name: header.index(name) for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in header
+        }
+
+        line = 2
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                break
+            chunk = _validate_rows(rows, positions, line, on_error)
+            line += len(rows)
+            if len(chunk["date"]):
+                yield chunk
+    finally:
+        if f is not source:
+            f.close()
+
+
+def read_parquet(path, chunk_size=CHUNK_SIZE, on_error=raise_row_error):
+    """Stream validated column chunks from a Parquet file (needs pyarrow)
+
+    `path` is a path or an open binary file. Invalid rows are passed to on_error(row number counting from 1, None,
+    error) and left out. Dates may be a date column or YYYY-MM-DD strings.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    names = [name for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in parquet.schema_arrow.names]
+    missing = [name for name in REQUIRED_COLUMNS if name not in names]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    number = 1
+    for batch in parquet.iter_batches(batch_size=chunk_size, columns=names):
+        chunk = {
+            name: batch.column(name).to_numpy(zero_copy_only=False) for name in names
+        }
+        chunk["date"] = _parse_dates(chunk["date"])
+        chunk["distance"] = chunk["distance"].astype(np.float64)
+        chunk["cost"] = chunk["cost"].astype(np.float64)
+        if "emission" in chunk:
+            chunk["emission"] = chunk["emission"].astype(np.float64)
+
+        valid = _valid_mask(chunk)
+        missing_date = np.isnat(chunk["date"])
+        for row in np.flatnonzero(~valid):
+            if missing_date[row]:
+                error = ValueError("missing or malformed date (expected YYYY-MM-DD)")
+            else:
+                error = ValueError("Values must be positive")
+            on_error(number + int(row), None, error)
+        number += len(valid)
+        if not valid.all():
+            chunk = {name: values[valid] for name, values in chunk.items()}
+        if len(chunk["date"]):
+            yield chunk
+
+
+def store_chunks(store, chunk_size=CHUNK_SIZE):
+    """Full-history column chunks of a TravelStore in date order"""
+    order = store.order("date")
+    for start in range(0, len(order), chunk_size):
+        rows = order[start:start + chunk_size]
+        yield {
+            "date": store["date"][rows],
+            "distance": store["distance"][rows],
+            "cost": store["cost"][rows],
+            "emission": store["emission"][rows],
+            "destination": store.destination_names(rows)
+        }
+
+
+def write_csv(chunks, target):
+    """Write column chunks as CSV to a path or an open text file; returns the row count"""
+    f = open(target, "w", newline="", encoding="utf-8") if isinstance(target, str) else target
+    try:
+        writer = csv.writer(f)
+        count = 0
+        for chunk in chunks:
+            if not count:
+                names = [name for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in chunk]
+                writer.writerow(names)
+            columns = [
+                chunk[name].astype(str).tolist() if name == "date" else chunk[name].tolist()
+                for name in names
+            ]
+            writer.writerows(zip(*columns))
+            count += len(chunk["date"])
+        return count
+    finally:
+        if f is not target:
+            f.close()
+
+
+def write_parquet(chunks, path):
+    """Write column chunks as one Parquet file (needs pyarrow); returns the row count
+
+    `path` is a path or an open binary file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    count = 0
+    try:
+        for chunk in chunks:
+            table = pa.table({
+                name: chunk[name] for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if name in chunk
+            })
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def _valid_mask(chunk):
+    distance, cost = chunk["distance"], chunk["cost"]
+    return (
+        ~np.isnat(chunk["date"])
+        & (distance > 0) & (distance < np.inf)
+        & (cost > 0) & (cost < np.inf)
+    )
+
+
+def _parse_dates(values):
+    """datetime64[D] from a date column or YYYY-MM-DD strings; NaT where missing or malformed"""
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[D]")
+    texts = np.char.strip(np.array(["" if value is None else str(value) for value in values]))
+    try:
+        dates = texts.astype("datetime64[D]")
+        if np.array_equal(dates.astype(str), texts):
+            return dates
+    except ValueError:
+        pass
+
+    dates = np.full(len(texts), np.datetime64("NaT"), dtype="datetime64[D]")
+    for i, text in enumerate(texts.tolist()):
+        try:
+            dates[i] = datetime.strptime(text, "%Y-%m-%d")
+        except ValueError:
+            pass
+    return dates
+
+
+def _validate_rows(rows, positions, first_line, on_error):
+    # Fast path: parse whole columns at once; fall back to per-row parsing to
+    # apply parse_record's rules and report exactly which rows are invalid
+    try:
+        columns = list(zip(*rows))
+        if len(columns) < len(positions) or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError("ragged rows")
+        # NumPy also takes "2024", "2024-01" or a time of day; parse_record only
+        # takes YYYY-MM-DD, so every date must format back to its own text
+        texts = np.char.strip(np.array(columns[positions["date"]], dtype=str))
+        dates = texts.astype("datetime64[D]")
+        if not np.array_equal(dates.astype(str), texts):
+            raise ValueError("dates not in YYYY-MM-DD form")
+        chunk = {
+            "date": dates,
+            "distance": np.array(columns[positions["distance"]], dtype=np.float64),
+            "cost": np.array(columns[positions["cost"]], dtype=np.float64)
+        }
+        if not _valid_mask(chunk).all():
+            raise ValueError("invalid values")
+        if "emission" in positions:
+            chunk["emission"] = np.array(columns[positions["emission"]], dtype=np.float64)
+        if "destination" in positions:
+            chunk["destination"] = np.array(columns[positions["destination"]], dtype=object)
+        return chunk
+    except (ValueError, IndexError):
+        pass
+
+    kept = {name: [] for name in positions}
+    for line, row in enumerate(rows, start=first_line):
+        try:
+            date, distance, cost = parse_record(
+                row[positions["date"]], row[positions["distance"]], row[positions["cost"]]
+            )
+            extra = {name: row[positions[name]] for name in OPTIONAL_COLUMNS if name in positions}
+            if "emission" in extra:
+                extra["emission"] = float(extra["emission"])
+        except (ValueError, IndexError) as e:
+            on_error(line, row, e)
+            continue
+        kept["date"].append(date)
+        kept["distance"].append(distance)
+        kept["cost"].append(cost)
+        for name, value in extra.items():
+            kept[name].append(value)
+
+    chunk = {
+        "date": np.array(kept["date"], dtype="datetime64[D]"),
+        "distance": np.array(kept["distance"], dtype=np.float64),
+        "cost": np.array(kept["cost"], dtype=np.float64)
+    }
+    if "emission" in kept:
+        chunk["emission"] = np.array(kept["emission"], dtype=np.float64)
+    if "destination" in kept:
+        chunk["destination"] = np.array(kept["destination"], dtype=object)
+    return chunk
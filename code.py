@@ -1,8 +1,8 @@
+import io
+import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from undo import History
 
 # Page configuration
 st.set_page_config(
@@ -11,6 +11,104 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_repository():
+    """Process-wide repository shared by every session"""
+    from travel_repository import TravelRepository
+    return TravelRepository("travel_tracker.db")
+
+@st.cache_resource
+def get_rates():
+    """Tariffs from rates.json if present, otherwise the built-in per-km defaults"""
+    from rates import RateTable
+    return RateTable.load("rates.json") if os.path.exists("rates.json") else RateTable()
+
+@st.cache_resource
+def get_aggregates():
+    """Per-city and per-vehicle weekly statistics shared by every session"""
+    from aggregates import AggregateService
+    return AggregateService()
+
+# History log sort options -> TravelRepository.log_page sort keys
+LOG_SORT_LABELS = {
+    "Date": "date",
+    "Destination": "destination",
+    "Distance": "distance",
+    "Cost": "cost",
+    "CO₂": "emission"
+}
+
+# Past destinations offered in each day's destination picker
+MAX_DESTINATION_SUGGESTIONS = 50
+
+# A day's saved values, as kept in undo versions
+DAY_FIELDS = ("traveled", "destination", "distance", "cost", "emission")
+
+def day_row(week, i):
+    """One day of a week store as an immutable tuple of DAY_FIELDS"""
+    return (
+        bool(week['traveled'][i]),
+        week.destinations[week['destination'][i]],
+        float(week['distance'][i]),
+        float(week['cost'][i]),
+        float(week['emission'][i])
+    )
+
+def step_history(step):
+    """Undo or redo one change: restore the profile and write back only the days that differ
+
+    A version is (profile items or None when signed out, {(user id, week
+    start, weekday): day row}) holding just the days edited this session;
+    days missing from a version still have their values from before the
+    first edit, kept in day_baseline.
+    """
+    history = st.session_state.history
+    _, before = history.current
+    step()
+    profile, after = history.current
+    baseline = st.session_state.day_baseline
+    changed = sorted(
+        key for key in before.keys() | after.keys()
+        if before.get(key, baseline[key]) != after.get(key, baseline[key])
+    )
+    if changed:
+        repository = get_repository()
+        for user_id, week_start in dict.fromkeys(key[:2] for key in changed):
+            days = [i for key_user, key_week, i in changed if (key_user, key_week) == (user_id, week_start)]
+            week = repository.load_week(user_id, week_start)
+            for i in days:
+                key = (user_id, week_start, i)
+                week.update(i, **dict(zip(DAY_FIELDS, after.get(key, baseline[key]))))
+            repository.save_trips(user_id, week, days)
+            for i in days:
+                for prefix in ("travel", "dest", "km"):
+                    st.session_state.pop(f"{prefix}_{week_start}_{i}", None)
+    st.session_state.user_data = dict(profile) if profile else {}
+    st.session_state.setup_complete = profile is not None
+    st.session_state.travel_data = None
+    st.session_state.destinations = None
+
+def undo_buttons():
+    """Sidebar Undo/Redo, labelled with the change each one reverts or re-applies"""
+    history = st.session_state.history
+    for column, text, label, step in zip(
+        st.sidebar.columns(2),
+        ("↶ Undo", "↷ Redo"),
+        (history.undo_label, history.redo_label),
+        (history.undo, history.redo)
+    ):
+        column.button(
+            f"{text} {label}" if label else text, disabled=label is None,
+            on_click=step_history, args=(step,), use_container_width=True
+        )
+
+# Derived views are cached on a content hash of the week (and the user profile
+# for the report), so reruns that don't change any travel value reuse them
+cache_by_content = st.cache_data(
+    max_entries=64,
+    hash_funcs={"travel_store.TravelStore": lambda store: store.fingerprint()}
+)
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -61,12 +159,16 @@ st.markdown("""
 if 'user_data' not in st.session_state:
     st.session_state.user_data = {}
 if 'travel_data' not in st.session_state:
-    st.session_state.travel_data = []
+    st.session_state.travel_data = None
 if 'setup_complete' not in st.session_state:
     st.session_state.setup_complete = False
+if 'history' not in st.session_state:
+    st.session_state.history = History((None, {}))
+    st.session_state.day_baseline = {}
 
 # User Information Setup
 if not st.session_state.setup_complete:
+    undo_buttons()
     st.header("📝 User Information")
     
     col1, col2 = st.columns(2)
@@ -82,17 +184,35 @@ if not st.session_state.setup_complete:
     if st.button("Continue to Travel Tracking", type="primary"):
         if name and vehicle and city:
             st.session_state.user_data = {
+                'id': get_repository().get_or_create_user(name, age, vehicle, city),
                 'name': name,
                 'age': age,
                 'vehicle': vehicle,
                 'city': city
             }
             st.session_state.setup_complete = True
+            history = st.session_state.history
+            history.commit((tuple(st.session_state.user_data.items()), history.current[1]), "sign-in")
             st.rerun()
         else:
             st.error("Please fill in all required fields!")
 
 else:
+    # The tracking page's dependencies (NumPy, pandas, Plotly) load on first
+    # use, so the setup page above starts without them
+    import bulk_io
+    import weekly_report
+    from rates import environmental_impact
+    from profiling import Profiler
+    from destinations import DestinationIndex, normalize
+    from rollups import Rollups
+    
+    distance_chart = cache_by_content(weekly_report.distance_chart)
+    cost_emission_chart = cache_by_content(weekly_report.cost_emission_chart)
+    travel_log = cache_by_content(weekly_report.travel_log)
+    summary_report = cache_by_content(weekly_report.summary_report)
+    history_chart = cache_by_content(weekly_report.history_chart)
+    
     # Display user info
     user = st.session_state.user_data
     st.sidebar.markdown(f"""
@@ -105,192 +225,301 @@ else:
     
     if st.sidebar.button("Reset User Info"):
         st.session_state.setup_complete = False
-        st.session_state.travel_data = []
+        st.session_state.travel_data = None
+        st.session_state.destinations = None
+        history = st.session_state.history
+        history.commit((None, history.current[1]), "reset")
         st.rerun()
+    undo_buttons()
+    
+    # Opt-in timing of this session's reruns, listed in the sidebar Performance panel
+    profiler = st.session_state.setdefault('profiler', Profiler(history=20))
+    profiler.enabled = st.sidebar.toggle("⏱️ Profile this session")
+    rerun = profiler.start("rerun")
+    
+    # Week selection; weeks are loaded from and saved to the repository
+    repository = get_repository()
+    rates = get_rates()
+    with rerun.phase("load week"):
+        week_of = st.sidebar.date_input("📆 Week of", value=date.today())
+        week_start = week_of - timedelta(days=week_of.weekday())
+        if st.session_state.get('week_start') != week_start or st.session_state.travel_data is None:
+            st.session_state.travel_data = repository.load_week(user['id'], week_start)
+            st.session_state.week_start = week_start
+        week = st.session_state.travel_data
+        
+        # Catalog of the rider's past destinations for autocomplete and km suggestions, and
+        # day/week/month rollups for period totals, built in one pass over the stored trips
+        if st.session_state.get('destinations') is None:
+            destinations, rollups = DestinationIndex(), Rollups()
+            for chunk in repository.iter_trips(user['id']):
+                destinations.extend(chunk["destination"], chunk["distance"], chunk["cost"], chunk["emission"])
+                rollups.add(chunk["date"].astype("int64"), chunk)
+            st.session_state.destinations, st.session_state.rollups = destinations, rollups
+        destinations = st.session_state.destinations
+        rollups = st.session_state.rollups
     
     # Days of the week
-    days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    days_of_week = weekly_report.DAYS_OF_WEEK
     
     # Travel Data Collection
     st.header("📅 Weekly Travel Data")
+    st.caption(f"{week_start:%d %b %Y} – {week_start + timedelta(days=6):%d %b %Y}")
     
     # Create tabs for each day
     tabs = st.tabs(days_of_week)
     
-    # Initialize travel data if empty
-    if len(st.session_state.travel_data) == 0:
-        st.session_state.travel_data = [
-            {'day': day, 'traveled': False, 'destination': '', 'km': 0, 'cost': 0, 'emission': 0}
-            for day in days_of_week
-        ]
-    
-    # Process each day
-    for i, (tab, day) in enumerate(zip(tabs, days_of_week)):
-        with tab:
-            st.markdown(f"<div class='day-header'><h3>📍 {day}</h3></div>", unsafe_allow_html=True)
-            
-            # Check if user traveled
-            traveled = st.radio(
-                f"Did you travel on {day}?",
-                options=[False, True],
-                format_func=lambda x: "Yes" if x else "No",
-                key=f"travel_{i}",
-                index=0 if not st.session_state.travel_data[i]['traveled'] else 1
+    def commit_day(i, **values):
+        """Store one day's edits, save just that row, and rerun the page for the new totals"""
+        key = (user['id'], week_start, i)
+        st.session_state.day_baseline.setdefault(key, day_row(week, i))
+        day = week['date'][i].astype("int64")
+        if week['traveled'][i]:
+            destinations.remove(
+                week.destinations[week['destination'][i]],
+                week['distance'][i], week['cost'][i], week['emission'][i]
             )
+            rollups.remove(day, {name: week[name][i] for name in ("distance", "cost", "emission")})
+        week.update(i, **values)
+        if values['traveled']:
+            destinations.add(values['destination'], values['distance'], values['cost'], values['emission'])
+            rollups.add(day, values)
+        repository.save_trips(user['id'], week, [i])
+        history = st.session_state.history
+        profile, days = history.current
+        history.commit((profile, {**days, key: day_row(week, i)}), f"{days_of_week[i]} edit")
+        st.rerun()
+    
+    def prefill_km(dest_key, km_key):
+        """Suggest the usual distance when a known destination is picked"""
+        place = st.session_state.destinations.stats(st.session_state[dest_key] or '')
+        if place:
+            st.session_state[km_key] = float(place['typical_km'])
+    
+    @st.fragment
+    def day_editor(i, day):
+        """One day's entry; changing it reruns only this tab until the day is saved"""
+        st.markdown(f"<div class='day-header'><h3>📍 {day}</h3></div>", unsafe_allow_html=True)
+        
+        # Check if user traveled
+        traveled = st.radio(
+            f"Did you travel on {day}?",
+            options=[False, True],
+            format_func=lambda x: "Yes" if x else "No",
+            key=f"travel_{week_start}_{i}",
+            index=0 if not week['traveled'][i] else 1
+        )
+        
+        if traveled:
+            # Past destinations, most visited first; a known one pre-fills its usual km
+            dest_key = f"dest_{week_start}_{i}"
+            km_key = f"km_{week_start}_{i}"
+            current = week.destinations[week['destination'][i]]
+            places = destinations.complete(limit=MAX_DESTINATION_SUGGESTIONS)
+            known = {normalize(place): place for place in places}
+            if current:
+                current = known.setdefault(normalize(current), current)
+                if current not in places:
+                    places.append(current)
+            destination = st.selectbox(
+                "Where did you travel?",
+                places,
+                index=places.index(current) if current else None,
+                key=dest_key,
+                accept_new_options=True,
+                placeholder="Pick a place or type a new one",
+                on_change=prefill_km,
+                args=(dest_key, km_key)
+            ) or ''
+            st.session_state.setdefault(km_key, float(week['distance'][i]))
             
-            if traveled:
-                destination = st.text_input(
-                    "Where did you travel?",
-                    key=f"dest_{i}",
-                    value=st.session_state.travel_data[i]['destination']
-                )
-                
+            # Typing in the form doesn't rerun anything; Save commits the day once
+            with st.form(f"day_{week_start}_{i}", border=False):
                 km = st.number_input(
                     "How many kilometers did you travel?",
-                    min_value=0,
-                    max_value=1000,
-                    value=st.session_state.travel_data[i]['km'],
-                    key=f"km_{i}"
+                    min_value=0.0,
+                    step=1.0,
+                    key=km_key
                 )
-                
-                if km > 0:
-                    cost = km * 75  # Cost calculation
-                    emission = km * 125  # Emission calculation
-                    
-                    # Display calculations
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("💰 Estimated Cost", f"₹{cost}")
-                    with col2:
-                        st.metric("📏 Distance", f"{km} km")
-                    with col3:
-                        st.metric("🌿 CO₂ Emission", f"{emission}g")
-                    
-                    # Update session state
-                    st.session_state.travel_data[i] = {
-                        'day': day,
-                        'traveled': True,
-                        'destination': destination,
-                        'km': km,
-                        'cost': cost,
-                        'emission': emission
-                    }
-                    
-                    st.success(f"✅ On {day}, {user['name']}, you traveled {km} km to {destination}. Estimated cost: ₹{cost}, CO₂ emitted: {emission}g")
+                saved = st.form_submit_button(f"💾 Save {day}")
+            
+            if saved:
+                if week['traveled'][i] and km == week['distance'][i]:
+                    # Unchanged distance keeps the stored (possibly imported) cost
+                    cost, emission = week['cost'][i], week['emission'][i]
                 else:
-                    st.session_state.travel_data[i]['traveled'] = True
-                    st.session_state.travel_data[i]['destination'] = destination
-            else:
-                st.session_state.travel_data[i] = {
-                    'day': day,
-                    'traveled': False,
-                    'destination': '',
-                    'km': 0,
-                    'cost': 0,
-                    'emission': 0
-                }
-                st.success(f"🌱 Great! You preserved money and reduced carbon emissions on {day}!")
+                    cost, emission = rates.compute(km, user['vehicle'], user['city']) if km > 0 else (0, 0)
+                commit_day(
+                    i,
+                    traveled=True,
+                    destination=destination,
+                    distance=km,
+                    cost=cost,
+                    emission=emission
+                )
+            
+            if not week['traveled'][i]:
+                st.caption(f"Save to add {day} to the week")
+            elif week['distance'][i] > 0:
+                km = week['distance'][i]
+                cost = week['cost'][i]
+                emission = week['emission'][i]
+                destination = week.destinations[week['destination'][i]]
+                
+                # Display calculations
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("💰 Estimated Cost", f"₹{cost:g}")
+                with col2:
+                    st.metric("📏 Distance", f"{km:g} km")
+                with col3:
+                    st.metric("🌿 CO₂ Emission", f"{emission:g}g")
+                
+                st.success(f"✅ On {day}, {user['name']}, you traveled {km:g} km to {destination}. Estimated cost: ₹{cost:g}, CO₂ emitted: {emission:g}g")
+        else:
+            if week['traveled'][i]:
+                commit_day(
+                    i,
+                    traveled=False,
+                    destination='',
+                    distance=0,
+                    cost=0,
+                    emission=0
+                )
+            st.success(f"🌱 Great! You preserved money and reduced carbon emissions on {day}!")
+    
+    # Process each day
+    for i, (tab, day) in enumerate(zip(tabs, days_of_week)):
+        with tab:
+            day_editor(i, day)
     
     # Summary Section
-    st.header("📊 Weekly Summary")
+    with rerun.phase("summary"):
+        st.header("📊 Weekly Summary")
     
-    # Calculate totals
-    total_km = sum([data['km'] for data in st.session_state.travel_data])
-    total_cost = sum([data['cost'] for data in st.session_state.travel_data])
-    total_emission = sum([data['emission'] for data in st.session_state.travel_data])
-    days_traveled = sum([1 for data in st.session_state.travel_data if data['traveled']])
+        # Calculate totals from the daily rollups; count is the number of days traveled
+        first_day = week['date'][0].astype("int64")
+        totals = rollups.totals(first_day, first_day + 6)
+        total_km = totals['distance']
+        total_cost = totals['cost']
+        total_emission = totals['emission']
+        days_traveled = totals['count']
     
-    # Display summary metrics
-    col1, col2, col3, col4 = st.columns(4)
+        # Display summary metrics
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.metric("🗓️ Days Traveled", f"{days_traveled}/7")
-    with col2:
-        st.metric("📏 Total Distance", f"{total_km} km")
-    with col3:
-        st.metric("💰 Total Cost", f"₹{total_cost}")
-    with col4:
-        st.metric("🌿 Total CO₂", f"{total_emission}g")
+        with col1:
+            st.metric("🗓️ Days Traveled", f"{days_traveled}/7")
+        with col2:
+            st.metric("📏 Total Distance", f"{total_km:g} km")
+        with col3:
+            st.metric("💰 Total Cost", f"₹{total_cost:g}")
+        with col4:
+            st.metric("🌿 Total CO₂", f"{total_emission:g}g")
     
-    # Create visualizations
-    if total_km > 0:
-        st.subheader("📈 Visual Analytics")
+    # This week against every rider's week, from the server-wide aggregates
+    with rerun.phase("compare"):
+        week_stats = get_aggregates().week(week_start, repository.week_totals_by_rider)
+        # Only riders who traveled this week count towards the comparison
+        if totals['count']:
+            week_stats.commit(user['id'], user['city'], user['vehicle'], totals)
+        else:
+            week_stats.discard(user['id'])
+        standing = week_stats.compare(user['city'], user['vehicle'], totals)
         
-        # Prepare data for charts
-        chart_data = []
-        for data in st.session_state.travel_data:
-            if data['traveled']:
-                chart_data.append(data)
+        st.subheader("🏙️ How You Compare")
+        col1, col2 = st.columns(2)
+        for col, label, group in (
+            (col1, f"In {user['city']}", standing['city']),
+            (col2, f"Among {user['vehicle']} riders", standing['vehicle'])
+        ):
+            with col:
+                st.markdown(f"**{label}** · {group['riders']} riders this week")
+                if group['distance']['rank'] is None:
+                    st.caption("You're the first rider here this week")
+                    continue
+                st.metric("📏 Median distance", f"{group['distance']['median']:.1f} km")
+                st.metric("🚴 You traveled more than", f"{group['distance']['rank']:.0%} of riders")
+                st.metric("🌿 Less CO₂ than", f"{1 - group['emission']['rank']:.0%} of riders")
+    
+    # Create visualizations
+    with rerun.phase("charts"):
+        if total_km > 0:
+            st.subheader("📈 Visual Analytics")
         
-        if chart_data:
-            df = pd.DataFrame(chart_data)
+            if days_traveled:
+                col1, col2 = st.columns(2)
             
-            col1, col2 = st.columns(2)
+                with col1:
+                    # Distance chart
+                    st.plotly_chart(distance_chart(week), use_container_width=True)
             
-            with col1:
-                # Distance chart
-                fig_distance = px.bar(
-                    df, 
-                    x='day', 
-                    y='km',
-                    title='Daily Distance Traveled',
-                    color='km',
-                    color_continuous_scale='Blues'
-                )
-                fig_distance.update_layout(showlegend=False)
-                st.plotly_chart(fig_distance, use_container_width=True)
-            
-            with col2:
-                # Cost and Emission chart
-                fig_multi = go.Figure()
-                fig_multi.add_trace(go.Bar(
-                    x=df['day'],
-                    y=df['cost'],
-                    name='Cost (₹)',
-                    marker_color='green',
-                    yaxis='y'
-                ))
-                fig_multi.add_trace(go.Bar(
-                    x=df['day'],
-                    y=df['emission'],
-                    name='CO₂ Emission (g)',
-                    marker_color='red',
-                    yaxis='y2'
-                ))
-                
-                fig_multi.update_layout(
-                    title='Daily Cost vs CO₂ Emissions',
-                    yaxis=dict(title='Cost (₹)', side='left'),
-                    yaxis2=dict(title='CO₂ Emission (g)', side='right', overlaying='y'),
-                    barmode='group'
-                )
-                st.plotly_chart(fig_multi, use_container_width=True)
+                with col2:
+                    # Cost and Emission chart
+                    st.plotly_chart(cost_emission_chart(week), use_container_width=True)
     
-    # Data Table
-    st.subheader("📋 Detailed Travel Log")
+        # Long-range chart from the finest rollup that fits the point budget, not raw trips
+        if st.toggle("📉 Show full distance history"):
+            period, table = weekly_report.history_table(rollups)
+            if len(table['period']):
+                st.plotly_chart(history_chart(period, table), use_container_width=True)
+            else:
+                st.info("No traveled days recorded yet")
     
-    # Create display dataframe
-    display_data = []
-    for data in st.session_state.travel_data:
-        display_data.append({
-            'Day': data['day'],
-            'Traveled': '✅ Yes' if data['traveled'] else '❌ No',
-            'Destination': data['destination'] if data['destination'] else '-',
-            'Distance (km)': data['km'],
-            'Cost (₹)': data['cost'],
-            'CO₂ Emission (g)': data['emission']
-        })
+    # Breakdown straight from the destination catalog's running aggregates
+    top_places = destinations.top(5)
+    if top_places:
+        st.subheader("📍 Top Destinations")
+        st.dataframe(weekly_report.top_destinations(top_places), use_container_width=True, hide_index=True)
     
-    df_display = pd.DataFrame(display_data)
-    st.dataframe(df_display, use_container_width=True)
+    # Data Table
+    with rerun.phase("table"):
+        st.subheader("📋 Detailed Travel Log")
+        log_scope = st.radio("Show", ["This week", "Full history"], horizontal=True, key="log_scope")
+        
+        if log_scope == "This week":
+            # Create display dataframe
+            df_display = travel_log(week)
+            st.dataframe(df_display, use_container_width=True)
+        else:
+            # Filtering, sorting and paging run in SQL; only the visible page is sent
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                log_destination = st.text_input("Destination contains", key="log_destination")
+                log_min_km = st.number_input("Minimum km", min_value=0, value=0, key="log_min_km")
+            with col2:
+                log_dates = st.date_input("Date range", value=(), key="log_dates")
+                log_sort = st.selectbox("Sort by", list(LOG_SORT_LABELS), key="log_sort")
+            with col3:
+                log_descending = st.toggle("Descending", value=True, key="log_descending")
+                page_size = st.selectbox("Rows per page", [25, 50, 100], key="log_page_size")
+            
+            log_start, log_end = (list(log_dates) + [None, None])[:2]
+            filters = {
+                'start': log_start,
+                'end': log_end,
+                'destination': log_destination.strip(),
+                'min_km': log_min_km
+            }
+            total_rows = repository.count_log(user['id'], **filters)
+            pages = max(1, -(-total_rows // page_size))
+            if st.session_state.get('log_page', 1) > pages:
+                st.session_state.log_page = pages
+            page = st.number_input("Page", min_value=1, max_value=pages, key="log_page") - 1
+            
+            log_rows = repository.log_page(
+                user['id'], page, page_size, LOG_SORT_LABELS[log_sort], log_descending, **filters
+            )
+            st.dataframe(weekly_report.history_log(log_rows), use_container_width=True, hide_index=True)
+            first_row = page * page_size + 1 if total_rows else 0
+            st.caption(f"Showing {first_row}–{page * page_size + len(log_rows['date'])} of {total_rows} traveled days")
     
     # Environmental Impact Section
     if total_emission > 0:
         st.subheader("🌍 Environmental Impact")
         
         # Calculate some environmental comparisons
-        trees_needed = round(total_emission / 22000, 2)  # Approximate CO2 absorbed by one tree per year
-        car_equivalent = round(total_emission / 404, 2)  # Average car CO2 per km
+        trees_needed, car_equivalent = environmental_impact(total_emission)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -302,18 +531,7 @@ else:
     st.subheader("💾 Export Data")
     if st.button("📥 Download Weekly Report", type="secondary"):
         # Create a summary report
-        report_data = {
-            'User ': [user['name']],
-            'Vehicle': [user['vehicle']],
-            'City': [user['city']],
-            'Week Summary': [f"{days_traveled} days traveled"],
-            'Total Distance': [f"{total_km} km"],
-            'Total Cost': [f"₹{total_cost}"],
-            'Total CO₂': [f"{total_emission}g"]
-        }
-        
-        report_df = pd.DataFrame(report_data)
-        csv = report_df.to_csv(index=False)
+        csv = summary_report(totals, user)
         
         st.download_button(
             label="📄 Download CSV Report",
@@ -321,6 +539,69 @@ else:
             file_name=f"travel_report_{user['name']}_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
+    
+    export_format = st.radio("Full history format", ("CSV", "Parquet"), horizontal=True)
+    if st.button("📦 Export Full History", type="secondary"):
+        # Stream every stored trip through the writer in chunks
+        if export_format == "Parquet":
+            history_file = io.BytesIO()
+            count = bulk_io.write_parquet(repository.iter_trips(user['id']), history_file)
+            extension, mime = "parquet", "application/vnd.apache.parquet"
+        else:
+            history_file = io.StringIO()
+            count = bulk_io.write_csv(repository.iter_trips(user['id']), history_file)
+            extension, mime = "csv", "text/csv"
+        
+        st.download_button(
+            label=f"📄 Download {count} Trips ({export_format})",
+            data=history_file.getvalue(),
+            file_name=f"travel_history_{user['name']}_{datetime.now().strftime('%Y%m%d')}.{extension}",
+            mime=mime
+        )
+    
+    uploaded = st.file_uploader(
+        "📤 Import trips (CSV or Parquet with date, distance, cost columns)", type=("csv", "parquet")
+    )
+    if uploaded is not None and st.button("Import Trips"):
+        imported = 0
+        days = set()
+        if uploaded.name.lower().endswith(".parquet"):
+            chunks = bulk_io.read_parquet(uploaded)
+        else:
+            chunks = bulk_io.read_csv(io.TextIOWrapper(uploaded, encoding="utf-8"))
+        try:
+            for chunk in chunks:
+                if "emission" not in chunk:
+                    _, chunk["emission"] = rates.compute(chunk["distance"], user['vehicle'], user['city'])
+                days.update(repository.import_trips(user['id'], chunk).tolist())
+                imported += len(chunk["date"])
+        except ValueError as e:
+            st.error(f"Import stopped after {imported} trips: {e}")
+        
+        if imported:
+            # Reload the selected week (and its widgets) from the repository
+            st.session_state.travel_data = None
+            st.session_state.destinations = None
+            for i in range(7):
+                for prefix in ("travel", "dest", "km"):
+                    st.session_state.pop(f"{prefix}_{week_start}_{i}", None)
+            st.success(f"✅ Imported {imported} trips into {len(days)} days")
+    
+    rerun.finish()
+    if profiler.enabled:
+        with st.sidebar.expander("⏱️ Performance"):
+            st.dataframe(
+                [{"Interaction": name, "Phase": phase, "ms": round(ms, 2)} for name, phase, ms in profiler.rows()],
+                use_container_width=True
+            )
+            st.download_button(
+                "Export JSON", profiler.to_json(),
+                file_name="travel_profile.json", mime="application/json"
+            )
+            st.download_button(
+                "Export Chrome Trace", profiler.to_chrome_trace(),
+                file_name="travel_trace.json", mime="application/json"
+            )
 
 # Footer
 st.markdown("---")
@@ -1,12 +1,28 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
-import pickle
-import os
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from sklearn.linear_model import LinearRegression
+import copy
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from journal import TravelJournal
+from forecasting import SeasonalTrendModel, huber_fit
+from rollups import Rollups, METRICS
+from downsample import level_of_detail
+from profiling import Profiler, NULL_INTERACTION
+from history_view import VirtualTreeview
+from date_index import DateIndex
+import bulk_io
+import quality
+from persistent import RecordTable
+from travel_store import TravelStore
+from undo import History
+
+# Days forecast per prediction; the labels report the 8th
+FORECAST_DAYS = 30
+# Most points the history scatter draws, about two per horizontal pixel
+CHART_POINTS = 1000
+# Undo/redo steps touching more records than this rebuild the indexes instead
+INCREMENTAL_CHANGES = 256
 
 class TravelPredictionApp:
     def __init__(self, root):
@@ -17,7 +33,22 @@ class TravelPredictionApp:
         self.style.theme_use('clam')
         
         # Initialize travel data
+        # Set TRAVEL_PROFILE=1 to time interactions and show the Performance window
+        self.profiler = Profiler.from_env()
+        self.journal = TravelJournal("travel_data.trv", legacy_path="travel_data.pkl")
         self.travel_data = self.load_data()
+        days = self.travel_data["date"].astype(np.int64)
+        self.index = DateIndex(days, self.travel_data["id"])
+        self.quality = quality.QualityCheck()
+        self.model = SeasonalTrendModel()
+        self.check_quality()
+        self.rollups = Rollups(self.day_values)
+        self.rollups.add(days, {name: self.travel_data[name] for name in METRICS})
+        # Every add, delete and import is a new version sharing all untouched records
+        self.versions = History(RecordTable.from_columns(
+            self.travel_data["id"], days, self.travel_data["distance"], self.travel_data["cost"]
+        ))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Configure grid layout
         self.root.grid_columnconfigure(0, weight=1)
@@ -34,7 +65,7 @@ class TravelPredictionApp:
         ).pack()
         
         tk.Label(
-            header_frame, text="Track your travel patterns and predict future journeys using linear regression", 
+            header_frame, text="Track your travel patterns and predict future journeys with weekly-seasonal forecasts", 
             font=("Arial", 10), bg="#4361ee", fg="white"
         ).pack()
         
@@ -69,21 +100,58 @@ class TravelPredictionApp:
         )
         add_button.grid(row=3, column=0, columnspan=2, pady=10, sticky="ew")
         
+        import_button = ttk.Button(input_frame, text="Import CSV/Parquet…", command=self.import_records)
+        import_button.grid(row=4, column=0, sticky="ew", padx=(0, 2))
+        export_button = ttk.Button(input_frame, text="Export History…", command=self.export_records)
+        export_button.grid(row=4, column=1, sticky="ew", padx=(2, 0))
+        self.undo_button = ttk.Button(input_frame, text="↶ Undo", command=self.undo, state="disabled")
+        self.undo_button.grid(row=5, column=0, sticky="ew", padx=(0, 2), pady=(5, 0))
+        self.redo_button = ttk.Button(input_frame, text="↷ Redo", command=self.redo, state="disabled")
+        self.redo_button.grid(row=5, column=1, sticky="ew", padx=(2, 0), pady=(5, 0))
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        if self.profiler.enabled:
+            performance_button = ttk.Button(input_frame, text="⏱️ Performance…", command=self.show_performance)
+            performance_button.grid(row=6, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        
         # Right panel (Prediction)
         prediction_frame = ttk.LabelFrame(main_frame, text="🔮 Predict 8th Day Travel", padding=15)
         prediction_frame.grid(row=0, column=1, sticky="nsew", padx=5, pady=5)
         
-        predict_button = tk.Button(
+        self.predict_button = tk.Button(
             prediction_frame, text="Predict Future Travel", 
             bg="#3a0ca3", fg="white", command=self.predict_future_travel
         )
-        predict_button.pack(fill="x", pady=10)
+        self.predict_button.pack(fill="x", pady=10)
+        
+        self.robust_fit = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            prediction_frame, text="Robust fit (Huber)", variable=self.robust_fit
+        ).pack(anchor="w")
+        
+        self.prediction_status = tk.Label(prediction_frame, text="", font=("Arial", 9, "italic"), fg="#666")
+        self.prediction_status.pack(anchor="w")
         
         self.prediction_result = tk.Frame(prediction_frame)
         self.prediction_result.pack(fill="x", pady=5)
+        self.prediction_labels = {
+            "date": tk.Label(self.prediction_result, font=("Arial", 10)),
+            "distance": tk.Label(self.prediction_result, font=("Arial", 10, "bold"), fg="#4361ee"),
+            "cost": tk.Label(self.prediction_result, font=("Arial", 10, "bold"), fg="#4361ee"),
+            "recent": tk.Label(self.prediction_result, font=("Arial", 10)),
+            "quality": tk.Label(self.prediction_result, font=("Arial", 9), fg="#666")
+        }
+        for label in self.prediction_labels.values():
+            label.pack(anchor="w")
         
         self.chart_frame = tk.Frame(prediction_frame)
         self.chart_frame.pack(fill="both", expand=True)
+        self.chart = None
+        
+        # Predictions run on a worker thread and report back via root.after
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.prediction_job = None
+        self.prediction_trace = NULL_INTERACTION
         
         # Bottom panel (History)
         history_frame = ttk.LabelFrame(main_frame, text="📝 Travel History", padding=15)
@@ -106,8 +174,9 @@ class TravelPredictionApp:
         self.tree.column("cost", width=100, anchor="center")
         self.tree.column("actions", width=100, anchor="center")
         
-        scrollbar = ttk.Scrollbar(history_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(history_frame, orient="vertical")
+        self.history = VirtualTreeview(self.tree, scrollbar, self.index, self.history_rows)
+        self.tree.bind("<<TreeviewSelect>>", self.delete_record)
         
         self.tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
@@ -116,56 +185,85 @@ class TravelPredictionApp:
         self.render_travel_data()
         
     def load_data(self):
-        """Load travel data from file if exists"""
-        if os.path.exists("travel_data.pkl"):
-            with open("travel_data.pkl", "rb") as f:
-                return pickle.load(f)
-        return []
+        """Load travel data from snapshot and journal if they exist"""
+        return TravelStore.from_columns(self.journal.load())
     
     def save_data(self):
-        """Save travel data to file"""
-        with open("travel_data.pkl", "wb") as f:
-            pickle.dump(self.travel_data, f)
+        """Fold the journal into a new snapshot once the log grows large"""
+        if self.journal.should_compact():
+            self.journal.compact(self.travel_data)
+    
+    def on_close(self):
+        """Compact the journal on exit so the next startup replays a short log"""
+        if self.journal.pending:
+            self.journal.compact(self.travel_data)
+        self.journal.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
     
     def render_travel_data(self):
-        """Render travel data in the treeview"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        if not self.travel_data:
-            return
-            
-        sorted_data = sorted(self.travel_data, key=lambda x: x['date'], reverse=True)
-        
-        for idx, item in enumerate(sorted_data):
-            self.tree.insert("", "end", values=(
-                item['date'].strftime("%Y-%m-%d"),
-                f"{item['distance']:.1f}",
-                f"{item['cost']:.2f}",
-                "Delete"
-            ), tags=(idx,))
-            
-        self.tree.tag_bind("delete", "<<TreeviewSelect>>", self.delete_record)
+        """Render travel data in the treeview (newest first)"""
+        with self.profiler.interaction("render history"):
+            with self.profiler.phase("treeview refresh"):
+                self.history.refresh()
+    
+    def history_rows(self, record_ids):
+        """Treeview values for the records the history view is about to show"""
+        with self.profiler.phase("format rows"):
+            rows = self.travel_data.rows(record_ids)
+            return [
+                (date, f"{distance:.1f}", f"{cost:.2f}", "Delete")
+                for date, distance, cost in zip(
+                    self.travel_data["date"][rows].astype(str).tolist(),
+                    self.travel_data["distance"][rows].tolist(),
+                    self.travel_data["cost"][rows].tolist()
+                )
+            ]
+    
+    def check_quality(self):
+        """Re-flag the whole history and refit the forecast model on the records that pass"""
+        days = self.travel_data["date"].astype(np.int64)
+        flags = self.quality.check(days, self.travel_data["distance"], self.travel_data["cost"])
+        self.travel_data.assign("flags", flags)
+        usable = (flags & quality.EXCLUDE_FROM_FORECAST) == 0
+        self.model.fit(days[usable], self.travel_data["distance"][usable])
+        # Kept up to date on add and delete, so predictions don't rescan the store
+        priced = (flags & quality.EXCLUDE_FROM_COST) == 0
+        self.priced_totals = {name: self.travel_data.total(name, priced) for name in ("distance", "cost")}
     
     def add_travel_record(self):
         """Add a new travel record"""
         try:
-            date = datetime.strptime(self.date_entry.get(), "%Y-%m-%d")
-            distance = float(self.distance_entry.get())
-            cost = float(self.cost_entry.get())
+            date, distance, cost = bulk_io.parse_record(
+                self.date_entry.get(), self.distance_entry.get(), self.cost_entry.get()
+            )
             
-            if distance <= 0 or cost <= 0:
-                raise ValueError("Values must be positive")
-                
             new_record = {
                 "date": date,
                 "distance": distance,
                 "cost": cost
             }
             
-            self.travel_data.append(new_record)
+            # Check against cached outlier bounds and the records already on that date
+            day = np.datetime64(date, "D").astype(np.int64)
+            same_day = self.travel_data.rows(self.index.range(day, day))
+            flags = self.quality.check_one(
+                distance, cost, self.travel_data["distance"][same_day], self.travel_data["cost"][same_day]
+            )
+            if flags & (quality.EXCLUDE_FROM_FORECAST | quality.EXCLUDE_FROM_COST) and not messagebox.askyesno(
+                "Check Record",
+                f"This record looks off ({', '.join(quality.describe(flags))}) and will be left "
+                "out of predictions. Save it anyway?"
+            ):
+                return
+            
+            record_id = self.journal.append(new_record)
+            self.insert_record(record_id, new_record, flags)
             self.save_data()
-            self.render_travel_data()
+            self.versions.commit(
+                self.versions.current.with_records([record_id], [day], [distance], [cost]), "add"
+            )
+            self.update_undo_buttons()
             
             # Clear inputs
             self.distance_entry.delete(0, "end")
@@ -174,100 +272,389 @@ class TravelPredictionApp:
         except ValueError as e:
             messagebox.showerror("Input Error", f"Invalid input: {str(e)}")
     
+    def import_records(self):
+        """Bulk-import travel records from a CSV or Parquet file in streaming chunks"""
+        path = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")]
+        )
+        if not path:
+            return
+            
+        imported = 0
+        table = self.versions.current
+        try:
+            if path.endswith(".parquet"):
+                chunks = bulk_io.read_parquet(path)
+            else:
+                chunks = bulk_io.read_csv(path)
+            for chunk in chunks:
+                columns = {name: chunk[name] for name in bulk_io.REQUIRED_COLUMNS}
+                ids = self.journal.append_batch(columns)
+                days = chunk["date"].astype(np.int64)
+                self.travel_data.append(ids=ids, **columns)
+                self.rollups.add(days, columns)
+                self.index.extend(days, ids)
+                table = table.with_records(ids, days, columns["distance"], columns["cost"])
+                imported += len(ids)
+        except (ValueError, OSError, ImportError) as e:
+            messagebox.showerror("Import Error", f"Import stopped after {imported} records: {str(e)}")
+        
+        if imported:
+            self.check_quality()
+            self.journal.compact(self.travel_data)
+            self.render_travel_data()
+            self.versions.commit(table, f"import of {imported}")
+            self.update_undo_buttons()
+            messagebox.showinfo("Import Complete", f"Imported {imported} records")
+    
+    def export_records(self):
+        """Export the full travel history to CSV or Parquet"""
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")]
+        )
+        if not path:
+            return
+            
+        try:
+            chunks = bulk_io.store_chunks(self.travel_data)
+            if path.endswith(".parquet"):
+                count = bulk_io.write_parquet(chunks, path)
+            else:
+                count = bulk_io.write_csv(chunks, path)
+        except (OSError, ImportError) as e:
+            messagebox.showerror("Export Error", str(e))
+            return
+        messagebox.showinfo("Export Complete", f"Exported {count} records")
+    
     def delete_record(self, event):
         """Delete selected travel record"""
-        item = self.tree.selection()[0]
-        index = int(self.tree.item(item, "tags")[0])
+        selection = self.tree.selection()
+        if not selection:
+            return
+        record_id = int(selection[0])
         
         if messagebox.askyesno("Confirm", "Delete this record?"):
-            del self.travel_data[index]
+            self.journal.delete(record_id)
+            self.remove_record(record_id)
             self.save_data()
-            self.render_travel_data()
+            self.versions.commit(self.versions.current.without([record_id]), "delete")
+            self.update_undo_buttons()
+    
+    def insert_record(self, record_id, record, flags):
+        """Add one record to the store, forecast model, rollups and history view"""
+        day = np.datetime64(record["date"], "D").astype(np.int64)
+        self.travel_data.append(ids=record_id, flags=flags, **record)
+        if not flags & quality.EXCLUDE_FROM_FORECAST:
+            self.model.add(day, record["distance"])
+        if not flags & quality.EXCLUDE_FROM_COST:
+            for name, total in self.priced_totals.items():
+                self.priced_totals[name] = total + record[name]
+        self.rollups.add(day, record)
+        self.history.inserted(self.index.add(day, record_id))
+    
+    def remove_record(self, record_id):
+        """Take one record out of the store, forecast model, rollups and history view"""
+        row = self.travel_data.row(record_id)
+        day = self.travel_data["date"][row].astype(np.int64)
+        flags = self.travel_data["flags"][row]
+        if not flags & quality.EXCLUDE_FROM_FORECAST:
+            self.model.remove(day, self.travel_data["distance"][row])
+        if not flags & quality.EXCLUDE_FROM_COST:
+            for name, total in self.priced_totals.items():
+                self.priced_totals[name] = total - float(self.travel_data[name][row])
+        self.quality.changed()
+        self.rollups.remove(day, {name: self.travel_data[name][row] for name in METRICS})
+        self.travel_data.delete(record_id)
+        self.history.removed(self.index.remove(day, record_id))
+    
+    def undo(self, event=None):
+        """Revert the last add, delete or import"""
+        self.step_history(self.versions.undo)
+    
+    def redo(self, event=None):
+        """Re-apply the last undone change"""
+        self.step_history(self.versions.redo)
+    
+    def step_history(self, step):
+        """Move to another version and apply only the records that differ from the current one"""
+        current = self.versions.current
+        label = step()
+        if label is None:
+            return
+        with self.profiler.interaction("undo/redo"):
+            with self.profiler.phase("diff versions"):
+                removed, added = current.changes(self.versions.current)
+            if len(removed) + len(added["id"]) > INCREMENTAL_CHANGES:
+                with self.profiler.phase("rebuild"):
+                    self.travel_data.delete(removed)
+                    if len(added["id"]):
+                        self.travel_data.append(ids=added["id"], date=added["date"],
+                                                distance=added["distance"], cost=added["cost"])
+                    self.rebuild_indexes()
+            else:
+                with self.profiler.phase("apply changes"):
+                    for record_id in removed.tolist():
+                        self.remove_record(record_id)
+                    for record_id, date, distance, cost in zip(
+                        added["id"].tolist(), added["date"], added["distance"].tolist(), added["cost"].tolist()
+                    ):
+                        day = date.astype(np.int64)
+                        same_day = self.travel_data.rows(self.index.range(day, day))
+                        flags = self.quality.check_one(
+                            distance, cost, self.travel_data["distance"][same_day], self.travel_data["cost"][same_day]
+                        )
+                        self.insert_record(record_id, {"date": date, "distance": distance, "cost": cost}, flags)
+            
+            # One journal entry per step, so undo costs what it changes
+            with self.profiler.phase("save"):
+                if len(added["id"]):
+                    # Restored ids land after newer ones; keep id lookups a binary search
+                    self.travel_data.sort("id")
+                self.journal.restore_batch(removed, added)
+                self.save_data()
+        self.update_undo_buttons()
+    
+    def day_values(self, day):
+        """(k, 3) metrics of one day's records, for the rollups to recompute its min and max"""
+        rows = self.travel_data.rows(self.index.range(day, day))
+        return np.column_stack([self.travel_data[name][rows] for name in METRICS])
+    
+    def rebuild_indexes(self):
+        """Recreate the date index, rollups and quality flags after a large change"""
+        days = self.travel_data["date"].astype(np.int64)
+        self.index = self.history.index = DateIndex(days, self.travel_data["id"])
+        self.rollups = Rollups(self.day_values)
+        self.rollups.add(days, {name: self.travel_data[name] for name in METRICS})
+        self.check_quality()
+        self.history.refresh()
+    
+    def update_undo_buttons(self):
+        """Name the change each button would revert or re-apply"""
+        for button, text, label in (
+            (self.undo_button, "↶ Undo", self.versions.undo_label),
+            (self.redo_button, "↷ Redo", self.versions.redo_label)
+        ):
+            button.configure(text=f"{text} {label}" if label else text, state="normal" if label else "disabled")
     
     def predict_future_travel(self):
-        """Predict travel for 8 days from now"""
+        """Predict travel for 8 days from now on the worker thread"""
         if len(self.travel_data) < 3:
             messagebox.showwarning(
                 "Not Enough Data", 
                 "You need at least 3 travel records to make a prediction"
             )
             return
+        if self.prediction_job is not None and not self.prediction_job.done():
+            return
             
-        # Clear previous prediction and chart
-        for widget in self.prediction_result.winfo_children():
-            widget.destroy()
-            
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-            
-        # Prepare data for regression
-        sorted_data = sorted(self.travel_data, key=lambda x: x['date'])
-        
-        # Convert dates to numeric (days since first record)
-        first_date = sorted_data[0]['date']
-        X = np.array([(d['date'] - first_date).days for d in sorted_data]).reshape(-1, 1)
-        y = np.array([d['distance'] for d in sorted_data])
-        
-        # Train linear regression model
-        model = LinearRegression()
-        model.fit(X, y)
+        # Snapshot everything the worker needs; the UI keeps running meanwhile
+        self.prediction_trace = trace = self.profiler.start("predict")
+        if self.quality.stale():
+            with trace.phase("check quality"):
+                self.check_quality()
+        with trace.phase("snapshot inputs"):
+            today = datetime.now()
+            today_day = np.datetime64(today.date(), "D").astype(np.int64)
+            recent = self.rollups.totals(today_day - 29, today_day)
+            # Records in date order straight from the index, so the worker needn't sort
+            rows = self.travel_data.rows(self.index.ids())
+            usable = (self.travel_data["flags"][rows] & quality.EXCLUDE_FROM_FORECAST) == 0
+            inputs = {
+                "today": today,
+                "first_day": self.index.first_day,
+                "days": self.index.days(),
+                "distance": self.travel_data["distance"][rows],
+                "total_distance": self.priced_totals["distance"],
+                "total_cost": self.priced_totals["cost"],
+                "recent_trips": recent["count"],
+                "recent_distance": recent["distance"],
+                "model": copy.copy(self.model),
+                "usable": usable,
+                "robust": self.robust_fit.get()
+            }
         
-        # Calculate prediction for 8 days from now
-        today = datetime.now()
+        self.predict_button.configure(state="disabled")
+        self.prediction_status.configure(text="Computing…")
+        self.prediction_job = self.executor.submit(self.compute_prediction, trace=trace, **inputs)
+        self.root.after(50, self.poll_prediction)
+    
+    def compute_prediction(self, today, first_day, days, distance, total_distance, total_cost,
+                           recent_trips, recent_distance, model, usable=None, robust=False,
+                           trace=NULL_INTERACTION):
+        """Prediction and chart data; runs on the worker thread and never touches Tk
+
+        days and distance come in date order, from the date index. usable masks
+        the records that passed the quality check; with robust the model is
+        refitted on them with Huber weights.
+        """
+        if usable is None:
+            usable = np.ones(len(days), dtype=bool)
+        if robust:
+            with trace.phase("robust fit"):
+                model = huber_fit(days[usable], distance[usable])
+        
+        # Days since first record, thinned to what the chart can show with spikes kept
+        with trace.phase("downsample history"):
+            X, y = level_of_detail(days - first_day, distance, CHART_POINTS, method="minmax")
+        
+        # Forecast the whole horizon in one batch; the 8th day is the headline
+        with trace.phase("forecast"):
+            today_day = int(np.datetime64(today.date(), "D").astype(np.int64))
+            forecast = model.forecast(today_day + 1, FORECAST_DAYS)
         prediction_date = today + timedelta(days=8)
-        days_since_first = (prediction_date - first_date).days
-        predicted_distance = model.predict([[days_since_first]])[0]
+        days_since_first = today_day + 8 - first_day
+        predicted_distance = float(forecast.mean[7])
         
         # Calculate average cost per km and predict cost
-        total_distance = sum(d['distance'] for d in self.travel_data)
-        total_cost = sum(d['cost'] for d in self.travel_data)
         avg_cost_per_km = total_cost / total_distance
         predicted_cost = predicted_distance * avg_cost_per_km
         
-        # Display prediction results
-        tk.Label(
-            self.prediction_result, 
-            text=f"Predicted travel on {prediction_date.strftime('%Y-%m-%d')}:",
-            font=("Arial", 10)
-        ).pack(anchor="w")
-        
-        tk.Label(
-            self.prediction_result, 
-            text=f"Distance: {predicted_distance:.1f} km",
-            font=("Arial", 10, "bold"),
-            fg="#4361ee"
-        ).pack(anchor="w")
-        
-        tk.Label(
-            self.prediction_result, 
-            text=f"Estimated cost: ₹{predicted_cost:.2f}",
-            font=("Arial", 10, "bold"),
-            fg="#4361ee"
-        ).pack(anchor="w")
-        
-        # Create and display regression chart
-        fig, ax = plt.subplots(figsize=(5, 3))
-        ax.scatter(X, y, color='blue', label='Actual Data')
-        
-        # Plot regression line
-        x_line = np.linspace(0, days_since_first, 100).reshape(-1, 1)
-        y_line = model.predict(x_line)
-        ax.plot(x_line, y_line, color='red', label='Regression Line')
-        
-        # Plot prediction point
-        ax.scatter([days_since_first], [predicted_distance], color='green', 
-                   s=100, label='8th Day Prediction')
+        # The trend is a straight line, so its two ends are enough
+        x_line = np.array([0, days_since_first], dtype=np.float64)
+        y_line = model.trend(first_day + x_line)
+        x_forecast = forecast.days - first_day
+        
+        return {
+            "prediction_date": prediction_date,
+            "predicted_distance": predicted_distance,
+            "predicted_range": (float(forecast.lower[7]), float(forecast.upper[7])),
+            "predicted_cost": predicted_cost,
+            "recent_trips": recent_trips,
+            "recent_distance": recent_distance,
+            "excluded": int(len(usable) - usable.sum()),
+            "points": np.column_stack([X, y]),
+            "line": (x_line, y_line),
+            "forecast": (x_forecast, forecast.mean, forecast.lower, forecast.upper),
+            "prediction_point": (days_since_first, predicted_distance)
+        }
+    
+    def poll_prediction(self):
+        """Hand the worker's result back to the Tk main loop once it is ready"""
+        if not self.prediction_job.done():
+            self.root.after(50, self.poll_prediction)
+            return
+            
+        self.predict_button.configure(state="normal")
+        self.prediction_status.configure(text="")
+        try:
+            result = self.prediction_job.result()
+        except Exception as e:
+            self.prediction_trace.finish()
+            messagebox.showerror("Prediction Error", str(e))
+            return
+        self.show_prediction(result)
+        self.prediction_trace.finish()
+    
+    def show_prediction(self, result):
+        """Update the prediction labels and the chart in place"""
+        with self.prediction_trace.phase("update labels"):
+            self.update_prediction_labels(result)
+        with self.prediction_trace.phase("update chart"):
+            self.update_chart(result)
+    
+    def update_prediction_labels(self, result):
+        """Headline numbers of a prediction"""
+        self.prediction_labels["date"].configure(
+            text=f"Predicted travel on {result['prediction_date'].strftime('%Y-%m-%d')}:"
+        )
+        low, high = result["predicted_range"]
+        interval = f" (95% range {max(low, 0):.1f}–{high:.1f})" if np.isfinite(high) else ""
+        self.prediction_labels["distance"].configure(
+            text=f"Distance: {result['predicted_distance']:.1f} km{interval}"
+        )
+        self.prediction_labels["cost"].configure(
+            text=f"Estimated cost: ₹{result['predicted_cost']:.2f}"
+        )
+        self.prediction_labels["recent"].configure(
+            text=f"Last 30 days: {result['recent_trips']} trips, {result['recent_distance']:.1f} km"
+        )
+        excluded = result["excluded"]
+        self.prediction_labels["quality"].configure(
+            text=f"{excluded} duplicate, invalid or outlier records left out" if excluded else ""
+        )
+    
+    def update_chart(self, result):
+        """Point the existing chart artists at a new prediction and schedule a redraw"""
+        if self.chart is None:
+            self.create_chart()
+        chart = self.chart
+        chart["actual"].set_offsets(result["points"])
+        chart["line"].set_data(*result["line"])
+        x_forecast, mean, lower, upper = result["forecast"]
+        chart["forecast"].set_data(x_forecast, mean)
+        chart["band"].set_verts([np.column_stack([
+            np.r_[x_forecast, x_forecast[::-1]], np.r_[lower, upper[::-1]]
+        ])])
+        chart["prediction"].set_offsets([result["prediction_point"]])
+        
+        ax = chart["ax"]
+        ax.ignore_existing_data_limits = True
+        ax.update_datalim(result["points"])
+        ax.update_datalim(np.column_stack([x_forecast, mean]))
+        ax.update_datalim([result["prediction_point"]])
+        ax.autoscale_view()
+        chart["canvas"].draw_idle()
+    
+    def show_performance(self):
+        """Window listing the last profiled interactions, with JSON and Chrome-trace export"""
+        window = tk.Toplevel(self.root)
+        window.title("Performance")
+        text = tk.Text(window, width=70, height=25, font=("Courier", 9))
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        def refresh():
+            text.delete("1.0", "end")
+            text.insert("end", f"{'Interaction':<20}{'Phase':<24}{'ms':>10}\n")
+            for interaction, phase, ms in self.profiler.rows():
+                text.insert("end", f"{interaction:<20}{phase:<24}{ms:>10.2f}\n")
+        
+        def export(kind):
+            path = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                initialfile="travel_trace.json" if kind == "trace" else "travel_profile.json",
+                filetypes=[("JSON files", "*.json")]
+            )
+            if not path:
+                return
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.profiler.to_chrome_trace() if kind == "trace" else self.profiler.to_json())
+        
+        buttons = ttk.Frame(window)
+        buttons.pack(fill="x", padx=10, pady=(0, 10))
+        ttk.Button(buttons, text="Refresh", command=refresh).pack(side="left")
+        ttk.Button(buttons, text="Export JSON…", command=lambda: export("json")).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Export Chrome Trace…", command=lambda: export("trace")).pack(side="left")
+        refresh()
+    
+    def create_chart(self):
+        """Create the forecast chart once; later predictions update its artists"""
+        # matplotlib is only needed once a prediction is shown, so load it here
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
+        fig = Figure(figsize=(5, 3))
+        ax = fig.add_subplot()
+        self.chart = {
+            "ax": ax,
+            "actual": ax.scatter([], [], color='blue', label='Actual Data'),
+            "line": ax.plot([], [], color='red', label='Trend')[0],
+            "forecast": ax.plot([], [], color='green', label=f'{FORECAST_DAYS}-Day Forecast')[0],
+            "band": ax.fill_between([], [], [], color='green', alpha=0.2),
+            "prediction": ax.scatter([], [], color='green', s=100, label='8th Day Prediction')
+        }
         
         ax.set_xlabel('Days Since First Record')
         ax.set_ylabel('Distance (km)')
         ax.set_title('Travel Distance Prediction')
         ax.legend()
         ax.grid(True)
+        fig.tight_layout()
         
         # Embed chart in tkinter window
         canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        canvas.draw()
         canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.chart["canvas"] = canvas
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,79 @@
+"""Sorted date index over travel record ids"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+# Keys pack (day, record_id) into one int64 so the index is a single flat array
+ID_BITS = 31
+ID_MASK = (1 << ID_BITS) - 1
+
+
+class DateIndex:
+    """Record ids kept ordered by (date, id) with bisect-based updates and range queries
+
+    Days are integer days since the epoch, as given by datetime64[D].astype(int64).
+    """
+
+    def __init__(self, days=(), ids=()):
+        keys = (np.asarray(days, dtype=np.int64) << ID_BITS) | np.asarray(ids, dtype=np.int64)
+        self._keys = array("q", np.sort(keys).tobytes())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def extend(self, days, ids):
+        """Merge a batch of records into the index"""
+        keys = (np.asarray(days, dtype=np.int64) << ID_BITS) | np.asarray(ids, dtype=np.int64)
+        merged = np.sort(np.concatenate([np.frombuffer(self._keys, dtype=np.int64), keys]))
+        self._keys = array("q", merged.tobytes())
+
+    def add(self, day, record_id):
+        """Insert a record and return its position"""
+        key = self._key(day, record_id)
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        return pos
+
+    def remove(self, day, record_id):
+        """Remove a record and return the position it had"""
+        pos = self.position(day, record_id)
+        del self._keys[pos]
+        return pos
+
+    def position(self, day, record_id):
+        """Position of a record in date order"""
+        key = self._key(day, record_id)
+        pos = bisect_left(self._keys, key)
+        if pos == len(self._keys) or self._keys[pos] != key:
+            raise KeyError(record_id)
+        return pos
+
+    @property
+    def first_day(self):
+        return self._keys[0] >> ID_BITS if self._keys else None
+
+    def bounds(self, start_day, end_day):
+        """Positions [start, stop) of records dated start_day..end_day inclusive"""
+        start = bisect_left(self._keys, int(start_day) << ID_BITS)
+        stop = bisect_left(self._keys, (int(end_day) + 1) << ID_BITS)
+        return start, stop
+
+    def range(self, start_day, end_day):
+        """Ids of records dated start_day..end_day inclusive, oldest first"""
+        return self.ids(*self.bounds(start_day, end_day))
+
+    def ids(self, start=0, stop=None):
+        """Ids between two positions, oldest first"""
+        return self._slice(start, stop) & ID_MASK
+
+    def days(self, start=0, stop=None):
+        """Days between two positions, oldest first"""
+        return self._slice(start, stop) >> ID_BITS
+
+    def _slice(self, start, stop):
+        # Copy the slice: numpy views would pin the array and block inserts
+        return np.frombuffer(self._keys[start:stop], dtype=np.int64)
+
+    def _key(self, day, record_id):
+        return (int(day) << ID_BITS) | int(record_id)
@@ -0,0 +1,134 @@
+"""Prefix-searchable catalog of visited destinations with running per-place trip stats"""
+import heapq
+from bisect import bisect_left, insort
+
+import numpy as np
+
+# Sorts after every real character, so [prefix, prefix + END) spans all keys with that prefix
+END = chr(0x10FFFF)
+STATS = ("distance", "cost", "emission")
+
+
+def normalize(name):
+    """Catalog key for a destination: case-folded, whitespace collapsed"""
+    return " ".join(str(name).split()).casefold()
+
+
+class DestinationIndex:
+    """Destinations kept sorted by normalized name, each with aggregates updated per trip
+
+    Completion is a bisect into the sorted keys, and the per-place totals and
+    km distribution are maintained on add/remove, so neither rescans history.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._places = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, name):
+        return normalize(name) in self._places
+
+    def extend(self, destinations, distance, cost, emission):
+        """Add a batch of trips; each distinct spelling is normalized once"""
+        names = np.asarray(destinations, dtype=object).astype(str)
+        values = {
+            "distance": np.asarray(distance, dtype=np.float64),
+            "cost": np.asarray(cost, dtype=np.float64),
+            "emission": np.asarray(emission, dtype=np.float64)
+        }
+        labels, inverse = np.unique(names, return_inverse=True)
+        keys = [normalize(label) for label in labels]
+        key_codes = {}
+        codes = np.array([key_codes.setdefault(key, len(key_codes)) for key in keys], dtype=np.int64)
+        groups = codes[inverse]
+        count = len(key_codes)
+
+        visits = np.bincount(groups, minlength=count)
+        sums = {name: np.bincount(groups, weights=column, minlength=count) for name, column in values.items()}
+        # Latest spelling of each place is the one shown
+        last = np.full(count, -1)
+        np.maximum.at(last, groups, np.arange(len(groups)))
+        order = np.lexsort((values["distance"], groups))
+        km = np.split(values["distance"][order], np.cumsum(visits)[:-1])
+
+        for key, code in key_codes.items():
+            if not key:
+                continue
+            place = self._places.get(key)
+            if place is None:
+                place = self._places[key] = {"visits": 0, "km": [], **dict.fromkeys(STATS, 0.0)}
+                insort(self._keys, key)
+            place["name"] = " ".join(names[last[code]].split())
+            place["visits"] += int(visits[code])
+            place["km"] = list(heapq.merge(place["km"], km[code].tolist()))
+            for name in STATS:
+                place[name] += float(sums[name][code])
+
+    def add(self, destination, distance, cost, emission):
+        """Record one trip to a destination"""
+        key = normalize(destination)
+        if not key:
+            return
+        place = self._places.get(key)
+        if place is None:
+            place = self._places[key] = {"visits": 0, "km": [], **dict.fromkeys(STATS, 0.0)}
+            insort(self._keys, key)
+        place["name"] = " ".join(str(destination).split())
+        place["visits"] += 1
+        insort(place["km"], float(distance))
+        place["distance"] += distance
+        place["cost"] += cost
+        place["emission"] += emission
+
+    def remove(self, destination, distance, cost, emission):
+        """Forget one previously added trip"""
+        key = normalize(destination)
+        place = self._places.get(key)
+        if place is None:
+            return
+        place["visits"] -= 1
+        if not place["visits"]:
+            del self._places[key]
+            del self._keys[bisect_left(self._keys, key)]
+            return
+        km = place["km"]
+        pos = bisect_left(km, float(distance))
+        if pos < len(km) and km[pos] == distance:
+            del km[pos]
+        place["distance"] -= distance
+        place["cost"] -= cost
+        place["emission"] -= emission
+
+    def complete(self, prefix="", limit=10):
+        """Display names of up to `limit` destinations starting with prefix, most visited first"""
+        key = normalize(prefix)
+        start = bisect_left(self._keys, key)
+        stop = bisect_left(self._keys, key + END, start)
+        keys = heapq.nlargest(limit, self._keys[start:stop], key=lambda k: self._places[k]["visits"])
+        return [self._places[k]["name"] for k in keys]
+
+    def stats(self, destination):
+        """Aggregates for one destination, or None if it was never visited"""
+        place = self._places.get(normalize(destination))
+        return None if place is None else self._stats(place)
+
+    def top(self, count=5, by="visits"):
+        """Aggregates of the `count` destinations with the largest visits, distance, cost or emission"""
+        places = heapq.nlargest(count, self._places.values(), key=lambda place: place[by])
+        return [self._stats(place) for place in places]
+
+    def _stats(self, place):
+        km = place["km"]
+        middle = len(km) // 2
+        return {
+            "name": place["name"],
+            "visits": place["visits"],
+            # Median, so one long detour doesn't move the suggestion
+            "typical_km": km[middle] if len(km) % 2 else (km[middle - 1] + km[middle]) / 2,
+            "distance": place["distance"],
+            "cost": place["cost"],
+            "emission": place["emission"]
+        }
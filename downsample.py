@@ -0,0 +1,78 @@
+"""Level-of-detail reduction of long series to a pixel budget"""
+import numpy as np
+
+# Above this many points per output point, a min/max pass runs before LTTB so
+# the LTTB loop only ever sees a bounded number of candidates
+MINMAX_RATIO = 4
+
+
+def min_max(x, y, buckets):
+    """Keep the min and max point of each of about `buckets` equal-count buckets, in x order
+
+    Preserves spikes and dips exactly, which makes it the right choice for
+    scatter plots and bar-like data.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= 2 * buckets:
+        return x, y
+    # Pad to a (buckets, size) grid so the arg-extremes are one pass each
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    starts = np.arange(rows) * size
+    grid = np.full(rows * size, np.inf)
+    grid[:n] = y
+    lows = grid.reshape(rows, size).argmin(axis=1)
+    grid[n:] = -np.inf
+    highs = grid.reshape(rows, size).argmax(axis=1)
+    keep = np.unique(np.concatenate([starts + lows, starts + highs]))
+    return x[keep], y[keep]
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` points that keep the visual shape of a line"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    xf = x.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Average point of every bucket, each bucket's triangle uses the next one's
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(xf[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    mean_x = np.r_[mean_x[1:], xf[-1]]
+    mean_y = np.r_[mean_y[1:], y[-1]]
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (xf[previous] - mean_x[i]) * (y[lo:hi] - y[previous])
+            - (xf[previous] - xf[lo:hi]) * (mean_y[i] - y[previous])
+        )
+        previous = lo + int(area.argmax())
+        keep[i + 1] = previous
+    return x[keep], y[keep]
+
+
+def level_of_detail(x, y, budget, method="lttb"):
+    """Series reduced to about `budget` points; short series are returned unchanged
+
+    x must be sorted. method is "lttb" for lines or "minmax" for scatter and
+    bars. Very long series get a min/max pass first, so the cost stays close
+    to one vectorized pass over the data however long the history grows.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= budget:
+        return x, y
+    if method == "minmax":
+        return min_max(x, y, budget // 2)
+    if len(x) > MINMAX_RATIO * budget:
+        x, y = min_max(x, y, MINMAX_RATIO * budget // 2)
+    return lttb(x, y, budget)
@@ -0,0 +1,251 @@
+"""Headless batch forecasts and weekly reports for every rider in the repository
+
+Riders are split into shards of consecutive user ids that a pool of worker
+processes turns into one part file each (part-00000.csv, ...) in the output
+directory. Part files appear atomically, so a run that stops part-way is
+resumed by running the same command again; only missing shards are redone.
+
+    python fleet.py travel_tracker.db reports/ [--as-of 2026-10-18] [--format csv|parquet]
+                    [--workers 4] [--shard-size 500] [--reprice rates.json] [--restart] [--quiet]
+
+--reprice first recomputes every stored trip's cost and emission under a new
+rate table, so the reports use the new tariffs.
+
+Needs neither Tk nor Streamlit.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import quality
+from forecasting import ModelBatch
+from rates import RateTable, environmental_impact
+from travel_repository import TravelRepository
+
+# The Tk app's prediction: a 30-day forecast whose 8th day is the headline,
+# offered once there are 3 records, next to the last 30 days' figures
+FORECAST_DAYS = 30
+PREDICTION_AHEAD = 8
+MIN_RECORDS = 3
+RECENT_DAYS = 30
+
+SHARD_SIZE = 500
+MANIFEST = "manifest.json"
+FORMATS = ("csv", "parquet")
+
+
+def shard_report(users, trips, as_of, week_start):
+    """Forecast and weekly report columns for a shard's riders, one row per rider
+
+    Only trips dated on or before as_of are used, so re-running a past date
+    gives the same numbers. trips are ordered by user as trips_between
+    returns them. Each rider's history is quality-checked on its own, as the
+    Tk app checks its one history; flagged records are left out of the fit
+    and the cost per km as there. All riders' models are fitted in one batch.
+    """
+    count = len(users["id"])
+    today = np.datetime64(as_of, "D").astype(np.int64)
+    days = trips["date"].astype(np.int64)
+    past = days <= today
+    days = days[past]
+    distance = trips["distance"][past]
+    cost = trips["cost"][past]
+    emission = trips["emission"][past]
+    groups = np.searchsorted(users["id"], trips["user_id"][past])
+
+    def per_rider(mask=None, weights=None):
+        if mask is None:
+            return np.bincount(groups, weights=weights, minlength=count)
+        return np.bincount(groups[mask], weights=None if weights is None else weights[mask], minlength=count)
+
+    records = per_rider()
+    total_distance = per_rider(weights=distance)
+    total_cost = per_rider(weights=cost)
+
+    flags = np.zeros(len(days), dtype=np.uint8)
+    checker = quality.QualityCheck()
+    bounds = np.searchsorted(groups, np.arange(count + 1))
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if hi > lo:
+            flags[lo:hi] = checker.check(days[lo:hi], distance[lo:hi], cost[lo:hi])
+    usable = (flags & quality.EXCLUDE_FROM_FORECAST) == 0
+    priced = (flags & quality.EXCLUDE_FROM_COST) == 0
+
+    forecast = ModelBatch.fit(days[usable], distance[usable], groups[usable], count).forecast(
+        today + 1, FORECAST_DAYS
+    )
+    ahead = PREDICTION_AHEAD - 1
+    predicted = forecast.mean[:, ahead].copy()
+    # A distance can't be negative, whatever the interval says
+    lower = np.maximum(forecast.lower[:, ahead], 0)
+    upper = forecast.upper[:, ahead].copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        predicted_cost = predicted * per_rider(priced, cost) / per_rider(priced, distance)
+    too_few = records < MIN_RECORDS
+    for column in (predicted, lower, upper, predicted_cost):
+        column[too_few] = np.nan
+
+    recent = days > today - RECENT_DAYS
+    week_day = np.datetime64(week_start, "D").astype(np.int64)
+    in_week = (days >= week_day) & (days <= week_day + 6)
+    week_emission = per_rider(in_week, emission)
+    trees_needed, car_equivalent = environmental_impact(week_emission)
+
+    return {
+        "user_id": users["id"],
+        "name": users["name"],
+        "vehicle": users["vehicle"],
+        "city": users["city"],
+        "as_of": np.full(count, np.datetime64(as_of, "D")),
+        "records": records,
+        "flagged_records": per_rider((flags & (quality.EXCLUDE_FROM_FORECAST | quality.EXCLUDE_FROM_COST)) != 0),
+        "total_km": total_distance,
+        "total_cost": total_cost,
+        "prediction_date": np.full(count, np.datetime64(as_of, "D") + PREDICTION_AHEAD),
+        "predicted_km": predicted,
+        "predicted_km_low": lower,
+        "predicted_km_high": upper,
+        "predicted_cost": predicted_cost,
+        "recent_trips": per_rider(recent),
+        "recent_km": per_rider(recent, distance),
+        "week_start": np.full(count, np.datetime64(week_start, "D")),
+        "week_days_traveled": per_rider(in_week),
+        "week_km": per_rider(in_week, distance),
+        "week_cost": per_rider(in_week, cost),
+        "week_emission_g": week_emission,
+        "trees_needed": trees_needed,
+        "car_equivalent_km": car_equivalent
+    }
+
+
+def part_path(out_dir, shard, fmt):
+    return os.path.join(out_dir, f"part-{shard:05d}.{fmt}")
+
+
+def write_part(report, path, fmt):
+    """Write a shard's report so the part file only ever appears complete"""
+    frame = pd.DataFrame(report)
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        frame.to_parquet(tmp_path, index=False)
+    else:
+        frame.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_shard(db_path, shard, shard_size, as_of, week_start, out_dir, fmt):
+    """Worker process: report the riders of one shard; returns (shard, riders)"""
+    first_id = shard * shard_size
+    repository = TravelRepository(db_path, pool_size=1)
+    try:
+        users = repository.users_between(first_id, first_id + shard_size - 1)
+        trips = repository.trips_between(first_id, first_id + shard_size - 1)
+    finally:
+        repository.close()
+    write_part(shard_report(users, trips, as_of, week_start), part_path(out_dir, shard, fmt), fmt)
+    return shard, len(users["id"])
+
+
+def check_manifest(out_dir, settings, restart):
+    """Refuse to mix part files from runs with different settings unless restarting"""
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path) and not restart:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous != settings:
+            raise SystemExit(
+                f"{out_dir} holds a run with different settings {previous}; "
+                "use --restart to discard it or choose another directory"
+            )
+        return
+    for stale in glob.glob(os.path.join(out_dir, "part-*")):
+        os.remove(stale)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", help="SQLite file written by the Streamlit tracker")
+    parser.add_argument("out_dir", help="directory for the part files")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(),
+                        help="forecast from this day and report its week (default: today)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="user ids per part file")
+    parser.add_argument("--reprice", metavar="RATES_JSON",
+                        help="recompute stored costs and emissions under this rate table first")
+    parser.add_argument("--restart", action="store_true", help="discard part files of an earlier run")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.database):
+        parser.error(f"{args.database} does not exist")
+    rates = RateTable.load(args.reprice) if args.reprice else None
+
+    week_start = args.as_of - timedelta(days=args.as_of.weekday())
+    settings = {
+        "database": os.path.abspath(args.database),
+        "as_of": args.as_of.isoformat(),
+        "format": args.format,
+        "shard_size": args.shard_size
+    }
+    if args.reprice:
+        settings["reprice"] = os.path.abspath(args.reprice)
+    os.makedirs(args.out_dir, exist_ok=True)
+    check_manifest(args.out_dir, settings, args.restart)
+
+    repository = TravelRepository(args.database)
+    try:
+        if rates is not None:
+            # Same tariffs give the same prices, so a resumed run may reprice again
+            repriced = repository.reprice(rates)
+            if not args.quiet:
+                print(f"Repriced {repriced} trips under {args.reprice}", file=sys.stderr)
+        first_id, last_id = repository.user_id_range()
+    finally:
+        repository.close()
+    shards = range(first_id // args.shard_size, last_id // args.shard_size + 1)
+    todo = [shard for shard in shards if not os.path.exists(part_path(args.out_dir, shard, args.format))]
+    done = len(shards) - len(todo)
+    if done and not args.quiet:
+        print(f"Resuming: {done} of {len(shards)} shards already written", file=sys.stderr)
+
+    started = time.perf_counter()
+    riders = 0
+    failed = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(run_shard, args.database, shard, args.shard_size, args.as_of, week_start,
+                        args.out_dir, args.format): shard
+            for shard in todo
+        }
+        for future in as_completed(futures):
+            try:
+                _, count = future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"Shard {futures[future]} failed: {e!r}", file=sys.stderr)
+                continue
+            done += 1
+            riders += count
+            if not args.quiet:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(shards)} shards, {riders} riders in {elapsed:.1f}s "
+                      f"({riders / elapsed:.0f} riders/s)", file=sys.stderr)
+
+    if failed:
+        print(f"{len(failed)} shards failed; run the same command again to retry them", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Day-of-week seasonal plus trend forecasts with prediction intervals"""
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+# Columns of the design matrix: intercept, trend, and offsets for Tuesday..Sunday
+# (Monday is the baseline). Day numbers are days since 1970-01-01, a Thursday.
+PARAMETERS = 8
+EPOCH_WEEKDAY = 3
+# The trend is solved per year rather than per day so the normal equations stay
+# well conditioned over long histories
+TREND_SCALE = np.array([1.0, 1 / 365] + [1.0] * 6)
+
+# Huber tuning constant (95% efficiency on normal residuals) and the MAD to
+# standard deviation factor used to scale residuals
+HUBER_DELTA = 1.345
+MAD_SCALE = 1.4826
+
+Forecast = namedtuple("Forecast", "days mean lower upper")
+
+
+def weekday(days):
+    """Monday=0 .. Sunday=6 for scalar or array day numbers"""
+    return (np.asarray(days, dtype=np.int64) + EPOCH_WEEKDAY) % 7
+
+
+def design(days, origin):
+    """Integer design matrix rows for day numbers, with the trend counted from origin"""
+    days = np.atleast_1d(np.asarray(days, dtype=np.int64))
+    trend = days - np.asarray(origin, dtype=np.int64)
+    X = np.zeros(trend.shape + (PARAMETERS,), dtype=np.int64)
+    X[..., 0] = 1
+    X[..., 1] = trend
+    X[..., 2:] = weekday(days)[..., None] == np.arange(1, 7)
+    return X
+
+
+def solve(n, xtx, xty, yty):
+    """Coefficients, (X'X)^-1 and residual variance from normal-equation sums
+
+    Works on one model or a stack of them (leading axes). Series that cannot
+    identify every parameter, e.g. no Sunday trips yet, get the minimum-norm
+    solution; the residual variance is NaN until there are more observations
+    than identifiable parameters.
+    """
+    n = np.asarray(n)
+    scale = TREND_SCALE[:, None] * TREND_SCALE[None, :]
+    A = xtx * scale
+    b = xty * TREND_SCALE
+    A_inv = np.linalg.pinv(A, hermitian=True)
+    beta = np.einsum("...ij,...j->...i", A_inv, b)
+
+    rank = np.linalg.matrix_rank(A, hermitian=True)
+    rss = yty - 2 * np.einsum("...i,...i->...", beta, b) + np.einsum("...i,...ij,...j->...", beta, A, beta)
+    dof = n - rank
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(dof > 0, np.maximum(rss, 0) / dof, np.nan)
+    return beta, A_inv, variance
+
+
+def interval(beta, A_inv, variance, X, level):
+    """Mean and lower/upper prediction bounds for scaled design rows X"""
+    mean = np.einsum("...hi,...i->...h", X, beta)
+    leverage = np.einsum("...hi,...ij,...hj->...h", X, A_inv, X)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    spread = z * np.sqrt(np.asarray(variance)[..., None] * (1 + leverage))
+    return mean, mean - spread, mean + spread
+
+
+class SeasonalTrendModel:
+    """Linear trend plus one offset per weekday, kept as running least-squares sums
+
+    Adds and removes update X'X, X'y and y'y in O(k) for k observations, so
+    the fitted state always matches the data; the solved coefficients are
+    cached until the next add or remove. Day numbers are counted from the
+    first day ever seen so X'X stays exact ints.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all observations"""
+        self.origin = None
+        self.n = 0
+        self.xtx = np.zeros((PARAMETERS, PARAMETERS), dtype=np.int64)
+        self.xty = np.zeros(PARAMETERS)
+        self.yty = 0.0
+        self._solution = None
+
+    def fit(self, days, values, weights=None):
+        """Refit from scratch on day numbers and values, optionally weighted per observation
+
+        Weighted sums are floats, so later adds and removes are no longer exact.
+        """
+        self.reset()
+        if weights is None:
+            self.add(days, values)
+            return self
+        days = np.asarray(days, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if not len(days):
+            return self
+        self.origin = int(days[0])
+        X = design(days, self.origin)
+        weighted = X * weights[:, None]
+        self.n = len(days)
+        self.xtx = X.T @ weighted
+        self.xty = weighted.T @ values
+        self.yty = float(weights @ (values * values))
+        return self
+
+    def add(self, days, values):
+        """Add one or many (day, value) observations"""
+        self._update(days, values, 1)
+
+    def remove(self, days, values):
+        """Remove previously added observations"""
+        self._update(days, values, -1)
+
+    def solution(self):
+        """(coefficients, (X'X)^-1, residual variance), solved once per change"""
+        if self._solution is None:
+            self._solution = solve(self.n, self.xtx, self.xty, self.yty)
+        return self._solution
+
+    def predict(self, days):
+        """Expected value on scalar or array day numbers"""
+        days = np.asarray(days)
+        if self.n == 0:
+            return np.zeros(days.shape)
+        beta = self.solution()[0]
+        X = design(days, self.origin) * TREND_SCALE
+        return (X @ beta).reshape(days.shape)
+
+    def trend(self, days):
+        """Deseasonalized level on scalar or array (possibly fractional) day numbers"""
+        days = np.asarray(days, dtype=np.float64)
+        if self.n == 0:
+            return np.zeros(days.shape)
+        beta = self.solution()[0]
+        weekly_mean = beta[2:].sum() / 7
+        return beta[0] + weekly_mean + beta[1] * TREND_SCALE[1] * (days - self.origin)
+
+    def forecast(self, start_day, horizon, level=0.95):
+        """Forecast for the `horizon` days from start_day in one batch"""
+        days = int(start_day) + np.arange(horizon)
+        if self.n == 0:
+            zeros = np.zeros(horizon)
+            return Forecast(days, zeros, zeros, zeros)
+        X = design(days, self.origin) * TREND_SCALE
+        return Forecast(days, *interval(*self.solution(), X, level))
+
+    def _update(self, days, values, sign):
+        days = np.atleast_1d(np.asarray(days, dtype=np.int64))
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if not len(days):
+            return
+        if self.origin is None:
+            self.origin = int(days[0])
+        X = design(days, self.origin)
+
+        # Rebind rather than update in place, so a copy.copy() snapshot handed
+        # to a worker thread keeps its own sums
+        self.n += sign * len(days)
+        self.xtx = self.xtx + sign * (X.T @ X)
+        self.xty = self.xty + sign * (X.T @ values)
+        self.yty += sign * float(values @ values)
+        self._solution = None
+        if self.n == 0:
+            self.reset()
+
+
+def huber_fit(days, values, delta=HUBER_DELTA, iterations=20, tolerance=1e-4):
+    """SeasonalTrendModel fitted by iteratively reweighted least squares with Huber weights
+
+    Residuals beyond delta robust standard deviations are down-weighted to
+    delta * scale / |residual|, so a few extreme days pull the fit linearly
+    rather than quadratically.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    model = SeasonalTrendModel().fit(days, values)
+    if not len(days):
+        return model
+    # One design matrix for every iteration; only the weights change
+    X = design(days, model.origin)
+    scaled = X * TREND_SCALE
+    beta = model.solution()[0]
+    weights = np.ones(len(values))
+    for _ in range(iterations):
+        residuals = np.abs(values - scaled @ beta)
+        scale = MAD_SCALE * np.median(residuals)
+        if not scale > 0:
+            break
+        updated = np.minimum(1.0, delta * scale / np.maximum(residuals, np.finfo(np.float64).tiny))
+        if np.abs(updated - weights).max() < tolerance:
+            break
+        weights = updated
+        weighted = X * weights[:, None]
+        beta = solve(len(days), X.T @ weighted, weighted.T @ values, float(weights @ (values * values)))[0]
+    return model.fit(days, values, weights)
+
+
+class ModelBatch:
+    """Seasonal trend models for many series, fitted and forecast together"""
+
+    def __init__(self, origin, n, xtx, xty, yty):
+        self.origin = origin
+        self.n = n
+        self.xtx = xtx
+        self.xty = xty
+        self.yty = yty
+        self.beta, self.A_inv, self.variance = solve(n, xtx, xty, yty)
+
+    def __len__(self):
+        return len(self.n)
+
+    @classmethod
+    def fit(cls, days, values, groups, count=None):
+        """Fit one model per group code (0..count-1) over concatenated series
+
+        Each normal-equation entry is one weighted bincount over all rows, so
+        the cost is a few passes over the data however many series there are.
+        """
+        days = np.asarray(days, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        groups = np.asarray(groups, dtype=np.int64)
+        count = int(groups.max()) + 1 if count is None and len(groups) else int(count or 0)
+
+        origin = np.full(count, np.iinfo(np.int64).max)
+        np.minimum.at(origin, groups, days)
+        n = np.bincount(groups, minlength=count)
+        origin[n == 0] = 0
+
+        # Columns: intercept, trend and the 0/1 weekday offsets
+        trend = (days - origin[groups]).astype(np.float64)
+        days_of_week = weekday(days)
+        columns = [None, trend] + [days_of_week == day for day in range(1, 7)]
+
+        def group_sum(weights):
+            return np.bincount(groups, weights=weights, minlength=count)
+
+        xtx = np.zeros((count, PARAMETERS, PARAMETERS))
+        xty = np.zeros((count, PARAMETERS))
+        xtx[:, 0, 0] = n
+        xtx[:, 0, 1] = xtx[:, 1, 0] = group_sum(trend)
+        xtx[:, 1, 1] = group_sum(trend * trend)
+        xty[:, 0] = group_sum(values)
+        xty[:, 1] = group_sum(trend * values)
+        for i in range(2, PARAMETERS):
+            # Weekday dummies are disjoint, so only their diagonal is non-zero
+            on_day = columns[i]
+            xtx[:, i, i] = xtx[:, 0, i] = xtx[:, i, 0] = np.bincount(groups[on_day], minlength=count)
+            xtx[:, 1, i] = xtx[:, i, 1] = group_sum(trend * on_day)
+            xty[:, i] = group_sum(values * on_day)
+        yty = group_sum(values * values)
+        return cls(origin, n, xtx, xty, yty)
+
+    def forecast(self, start_day, horizon, level=0.95):
+        """(series, horizon) forecasts for the same days in every series"""
+        days = int(start_day) + np.arange(horizon)
+        X = design(days[None, :], self.origin[:, None]) * TREND_SCALE
+        mean, lower, upper = interval(self.beta, self.A_inv, self.variance, X, level)
+        empty = self.n == 0
+        mean[empty] = lower[empty] = upper[empty] = 0.0
+        return Forecast(days, mean, lower, upper)
@@ -0,0 +1,96 @@
+"""Virtualized, incrementally updated history view for ttk.Treeview"""
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Only materializes the rows of a DateIndex that are in view, newest first
+
+    The tree holds at most one window of items, with record ids as iids, and
+    scrolling or edits diff that window instead of re-rendering the history.
+    """
+
+    def __init__(self, tree, scrollbar, index, fetch_rows):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.index = index
+        self.fetch_rows = fetch_rows
+        self.window = int(tree.cget("height"))
+        self.offset = 0
+
+        rowheight = ttk.Style().lookup("Treeview", "rowheight")
+        self.row_height = int(rowheight) if rowheight else 20
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.yview("scroll", -1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.yview("scroll", 1, "pages"))
+
+    def refresh(self):
+        """Show the top of the history; used once on startup"""
+        self.offset = 0
+        self._refresh()
+
+    def inserted(self, pos):
+        """Update after the index inserted a record at `pos`"""
+        if len(self.index) - 1 - pos < self.offset:
+            # Keep the rows currently on screen where they are
+            self.offset += 1
+            self._update_scrollbar()
+        else:
+            self._refresh()
+
+    def removed(self, pos):
+        """Update after the index removed the record at `pos`"""
+        if len(self.index) - pos < self.offset:
+            self.offset -= 1
+            self._update_scrollbar()
+        else:
+            self._refresh()
+
+    def yview(self, *args):
+        """Scrollbar and wheel handler that moves the materialized window"""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.index))
+        elif args[0] == "scroll":
+            step = self.window if args[2] == "pages" else 1
+            self.offset += int(args[1]) * step
+        self._refresh()
+        return "break"
+
+    def _on_resize(self, event):
+        window = max(1, event.height // self.row_height - 1)
+        if window != self.window:
+            self.window = window
+            self._refresh()
+
+    def _refresh(self):
+        total = len(self.index)
+        self.offset = max(0, min(self.offset, total - self.window))
+        # Display rows run newest first, i.e. backwards through the index
+        stop = total - self.offset
+        window_ids = self.index.ids(max(0, stop - self.window), stop)[::-1].tolist()
+        wanted = [str(record_id) for record_id in window_ids]
+
+        stale = set(self.tree.get_children()) - set(wanted)
+        if stale:
+            self.tree.delete(*stale)
+
+        missing = [record_id for record_id, iid in zip(window_ids, wanted) if not self.tree.exists(iid)]
+        values = dict(zip(missing, self.fetch_rows(missing))) if missing else {}
+
+        for index, (record_id, iid) in enumerate(zip(window_ids, wanted)):
+            if record_id in values:
+                self.tree.insert("", index, iid=iid, values=values[record_id])
+            else:
+                self.tree.move(iid, "", index)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.index)
+        if not total:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.window) / total))
@@ -0,0 +1,268 @@
+"""Append-only journal storage for travel records"""
+import os
+import pickle
+import struct
+import zlib
+
+import numpy as np
+
+import travel_format
+
+# Each log entry is framed as (payload length, crc32) followed by the payload
+FRAME_HEADER = struct.Struct("<II")
+
+# Log payloads: an op code, then fixed-width fields. A batch add is followed by
+# its day, distance and cost columns as raw int64/float64/float64 arrays, a
+# batch delete by its ids as a raw int64 array, and a restore by the removed
+# ids, then the restored ids, days, distances and costs.
+ADD = struct.Struct("<cqqdd")
+ADD_MANY = struct.Struct("<cqq")
+DELETE = struct.Struct("<cq")
+DELETE_MANY = struct.Struct("<cq")
+RESTORE = struct.Struct("<cqq")
+NO_IDS = np.zeros(0, dtype=np.int64)
+
+
+class TravelJournal:
+    """Crash-safe binary snapshot plus an append-only log of add/delete/restore operations
+
+    load() returns columns (id, date, distance, cost) rather than records. A
+    pickle snapshot left by an older version at legacy_path is migrated to
+    the binary format on first load and kept as legacy_path + ".bak".
+    """
+
+    def __init__(self, path="travel_data.trv", legacy_path="travel_data.pkl", compact_every=1000,
+                 fsync=True, compress=False):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.log_path = os.path.splitext(path)[0] + ".log"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.compress = compress
+        self.next_id = 0
+        self.pending = 0
+        self._log = None
+
+    def load(self):
+        """Replay snapshot and log tail into a dict of column arrays"""
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            self._migrate()
+
+        if os.path.exists(self.path):
+            columns, self.next_id = travel_format.read(self.path)
+        else:
+            columns, self.next_id = travel_format.empty(), 0
+
+        # Every log entry sets the final state of the ids it names, replayed in
+        # log order, so a record ends up as its last entry left it. A log that
+        # a crash left behind after the snapshot was written only repeats what
+        # the snapshot holds, and replaying it again changes nothing.
+        touched, present, added = [], [], []
+        self.pending = 0
+        for removed, batch in self._read_log():
+            self.pending += 1
+            touched += [removed, batch["id"]]
+            present += [np.zeros(len(removed), dtype=bool), np.ones(len(batch["id"]), dtype=bool)]
+            added.append(batch)
+        if not self.pending:
+            return columns
+
+        touched = np.concatenate(touched)
+        if len(touched):
+            self.next_id = max(self.next_id, int(touched.max()) + 1)
+        # Last entry for each id: first occurrence in the reversed log
+        ids, first = np.unique(touched[::-1], return_index=True)
+        last = len(touched) - 1 - first
+        keep = ~np.isin(columns["id"], ids)
+        added = {name: np.concatenate([batch[name] for batch in added]) for name in columns}
+        # touched interleaves removed and added ids; map each kept last entry to its added row
+        rows = np.cumsum(np.concatenate(present)) - 1
+        present = np.concatenate(present)[last]
+        last = rows[last[present]]
+        return {
+            name: np.concatenate([values[keep], added[name][last]]) for name, values in columns.items()
+        }
+
+    def append(self, record):
+        """Log a new record and return its id"""
+        record_id = self.next_id
+        day = np.datetime64(record["date"], "D").astype(np.int64)
+        self._write(ADD.pack(b"A", record_id, day, record["distance"], record["cost"]))
+        self.next_id += 1
+        return record_id
+
+    def append_batch(self, columns):
+        """Log many records as one entry; columns maps field -> array. Returns their ids"""
+        count = len(columns["date"])
+        first_id = self.next_id
+        self._write(
+            ADD_MANY.pack(b"M", first_id, count)
+            + np.asarray(columns["date"], dtype="datetime64[D]").astype("<i8").tobytes()
+            + np.asarray(columns["distance"], dtype="<f8").tobytes()
+            + np.asarray(columns["cost"], dtype="<f8").tobytes()
+        )
+        self.next_id += count
+        return range(first_id, first_id + count)
+
+    def delete(self, record_id):
+        """Log the deletion of a record"""
+        self._write(DELETE.pack(b"D", record_id))
+
+    def delete_batch(self, ids):
+        """Log the deletion of many records as one entry"""
+        ids = np.asarray(ids, dtype="<i8")
+        self._write(DELETE_MANY.pack(b"X", len(ids)) + ids.tobytes())
+
+    def restore_batch(self, removed, columns):
+        """Log one undo or redo step as a single entry
+
+        Replay drops the removed ids, then puts back the records in columns
+        (id, date, distance, cost) under their own ids.
+        """
+        removed = np.asarray(removed, dtype="<i8")
+        ids = np.asarray(columns["id"], dtype="<i8")
+        self._write(
+            RESTORE.pack(b"R", len(removed), len(ids))
+            + removed.tobytes()
+            + ids.tobytes()
+            + np.asarray(columns["date"], dtype="datetime64[D]").astype("<i8").tobytes()
+            + np.asarray(columns["distance"], dtype="<f8").tobytes()
+            + np.asarray(columns["cost"], dtype="<f8").tobytes()
+        )
+        if len(ids):
+            self.next_id = max(self.next_id, int(ids.max()) + 1)
+
+    def should_compact(self):
+        """Whether the log has grown enough to fold into a new snapshot"""
+        return self.pending >= self.compact_every
+
+    def compact(self, columns):
+        """Atomically write a snapshot of id/date/distance/cost columns and reset the log"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            travel_format.write(f, columns, self.next_id, compress=self.compress)
+            self._sync(f)
+        os.replace(tmp_path, self.path)
+        self._sync_dir()
+
+        # The old log replayed over the new snapshot yields that snapshot again
+        # (see load), so a crash before this truncation loses nothing
+        self.close()
+        with open(self.log_path, "wb") as f:
+            self._sync(f)
+        self.pending = 0
+
+    def close(self):
+        """Close the log file handle"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _write(self, payload):
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._sync(self._log)
+        self.pending += 1
+
+    def _read_log(self):
+        """Decode each log entry as (removed ids, added id/date/distance/cost columns)"""
+        for payload in self._read_frames():
+            kind = payload[:1]
+            if kind == b"A":
+                _, record_id, day, distance, cost = ADD.unpack(payload)
+                yield NO_IDS, {
+                    "id": np.array([record_id], dtype=np.int64),
+                    "date": np.array([day], dtype=np.int64).view("datetime64[D]"),
+                    "distance": np.array([distance]),
+                    "cost": np.array([cost])
+                }
+            elif kind == b"M":
+                _, first_id, count = ADD_MANY.unpack_from(payload)
+                arrays = np.frombuffer(payload, dtype="<i8", offset=ADD_MANY.size, count=3 * count)
+                yield NO_IDS, {
+                    "id": np.arange(first_id, first_id + count, dtype=np.int64),
+                    "date": arrays[:count].view("datetime64[D]"),
+                    "distance": arrays[count:2 * count].view("<f8"),
+                    "cost": arrays[2 * count:].view("<f8")
+                }
+            elif kind == b"D":
+                yield np.array([DELETE.unpack(payload)[1]], dtype=np.int64), travel_format.empty()
+            elif kind == b"X":
+                _, count = DELETE_MANY.unpack_from(payload)
+                ids = np.frombuffer(payload, dtype="<i8", offset=DELETE_MANY.size, count=count)
+                yield ids, travel_format.empty()
+            elif kind == b"R":
+                _, removed, count = RESTORE.unpack_from(payload)
+                arrays = np.frombuffer(payload, dtype="<i8", offset=RESTORE.size, count=removed + 4 * count)
+                restored = arrays[removed:]
+                yield arrays[:removed], {
+                    "id": restored[:count],
+                    "date": restored[count:2 * count].view("datetime64[D]"),
+                    "distance": restored[2 * count:3 * count].view("<f8"),
+                    "cost": restored[3 * count:].view("<f8")
+                }
+            else:
+                raise travel_format.FormatError(f"{self.log_path}: unknown log entry {kind!r}")
+
+    def _read_frames(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as f:
+            data = f.read()
+
+        offset = 0
+        while offset + FRAME_HEADER.size <= len(data):
+            length, crc = FRAME_HEADER.unpack_from(data, offset)
+            start = offset + FRAME_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            yield payload
+            offset = start + length
+
+        # Drop a torn tail left behind by a crash mid-append
+        if offset < len(data):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(offset)
+
+    def _migrate(self):
+        """One-time conversion of travel_data.pkl, a pickled list of record dicts"""
+        with open(self.legacy_path, "rb") as f:
+            records = LegacyUnpickler(f).load()
+        self.next_id = len(records)
+        self.compact({
+            "id": np.arange(len(records), dtype=np.int64),
+            "date": np.array([np.datetime64(r["date"], "D") for r in records], dtype="datetime64[D]"),
+            "distance": np.fromiter((r["distance"] for r in records), dtype=np.float64, count=len(records)),
+            "cost": np.fromiter((r["cost"] for r in records), dtype=np.float64, count=len(records))
+        })
+        os.replace(self.legacy_path, self.legacy_path + ".bak")
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _sync_dir(self):
+        if not self.fsync or os.name != "posix":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class LegacyUnpickler(pickle.Unpickler):
+    """Unpickler for the old travel file that only builds dates"""
+
+    ALLOWED = {
+        ("datetime", "datetime"),
+        ("datetime", "date")
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a travel file")
+        return super().find_class(module, name)
@@ -0,0 +1,207 @@
+"""Persistent, structurally shared table of travel records keyed by record id"""
+from itertools import groupby
+
+import numpy as np
+
+# A radix trie over record ids: LEAF_SIZE-row NumPy leaves under BRANCH-way tuples
+LEAF_SIZE = 64
+BRANCH = 32
+ROW = np.dtype([("present", "?"), ("date", "<i8"), ("distance", "<f8"), ("cost", "<f8")])
+
+
+class RecordTable:
+    """Immutable id -> (day, distance, cost) table
+
+    Updates return a new table that copies only the touched leaves and the
+    O(log n) branch tuples above them and shares everything else, so keeping
+    old versions around for undo is cheap. changes() skips shared subtrees,
+    so comparing two nearby versions costs what differs between them.
+    """
+
+    def __init__(self, root=None, depth=0, count=0):
+        self.root = root
+        self.depth = depth
+        self.count = count
+
+    @classmethod
+    def from_columns(cls, ids, days, distance, cost):
+        """Table of unique record ids and their columns, built without per-record Python work"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return cls()
+        size = int(ids.max()) + 1
+        depth = 0
+        while LEAF_SIZE * BRANCH ** depth < size:
+            depth += 1
+        leaves = -(-size // LEAF_SIZE)
+        rows = np.zeros(leaves * LEAF_SIZE, dtype=ROW)
+        rows["present"][ids] = True
+        rows["date"][ids] = np.asarray(days).astype(np.int64)
+        rows["distance"][ids] = distance
+        rows["cost"][ids] = cost
+        rows.flags.writeable = False
+
+        # Leaves are read-only views of one array; branches are tuples
+        nodes = [rows[start:start + LEAF_SIZE] for start in range(0, len(rows), LEAF_SIZE)]
+        for _ in range(depth):
+            nodes = [
+                tuple(nodes[start:start + BRANCH]) + (None,) * (BRANCH - len(nodes[start:start + BRANCH]))
+                for start in range(0, len(nodes), BRANCH)
+            ]
+        return cls(nodes[0], depth, len(ids))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return LEAF_SIZE * BRANCH ** self.depth
+
+    def get(self, record_id):
+        """(day, distance, cost) of a record, or None if it is not in the table"""
+        if record_id >= self.capacity:
+            return None
+        leaf = self._leaf(record_id // LEAF_SIZE)
+        if leaf is None or not leaf["present"][record_id % LEAF_SIZE]:
+            return None
+        row = leaf[record_id % LEAF_SIZE]
+        return int(row["date"]), float(row["distance"]), float(row["cost"])
+
+    def with_records(self, ids, days, distance, cost):
+        """New table with these records added or overwritten"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return self
+        columns = {
+            "date": np.asarray(days).astype(np.int64),
+            "distance": np.broadcast_to(np.asarray(distance, dtype=np.float64), ids.shape),
+            "cost": np.broadcast_to(np.asarray(cost, dtype=np.float64), ids.shape)
+        }
+        table = self._grown(int(ids.max()) + 1)
+        added = 0
+        updates = {}
+        for leaf_number, positions in _by_leaf(ids):
+            old = table._leaf(leaf_number)
+            leaf = np.zeros(LEAF_SIZE, dtype=ROW) if old is None else old.copy()
+            slots = ids[positions] % LEAF_SIZE
+            added += int(np.count_nonzero(~leaf["present"][slots]))
+            leaf["present"][slots] = True
+            for name, values in columns.items():
+                leaf[name][slots] = values[positions]
+            leaf.flags.writeable = False
+            updates[leaf_number] = leaf
+        return RecordTable(table._replace(updates), table.depth, table.count + added)
+
+    def without(self, ids):
+        """New table with these records removed; unknown ids are ignored"""
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[ids < self.capacity]
+        removed = 0
+        updates = {}
+        for leaf_number, positions in _by_leaf(ids):
+            old = self._leaf(leaf_number)
+            if old is None:
+                continue
+            slots = ids[positions] % LEAF_SIZE
+            removed += int(np.count_nonzero(old["present"][slots]))
+            leaf = old.copy()
+            leaf["present"][slots] = False
+            leaf.flags.writeable = False
+            updates[leaf_number] = leaf if leaf["present"].any() else None
+        if not updates:
+            return self
+        return RecordTable(self._replace(updates), self.depth, self.count - removed)
+
+    def changes(self, target):
+        """(removed ids, added columns) that turn this table's records into target's
+
+        A record whose values differ counts as removed and added. Added
+        columns are id, date (datetime64[D]), distance and cost.
+        """
+        depth = max(self.depth, target.depth)
+        pairs = []
+        _diff(self._grown_to(depth).root, target._grown_to(depth).root, depth, 0, pairs)
+
+        removed, added = [], []
+        for leaf_number, old, new in pairs:
+            old = np.zeros(LEAF_SIZE, dtype=ROW) if old is None else old
+            new = np.zeros(LEAF_SIZE, dtype=ROW) if new is None else new
+            differ = (old["present"] != new["present"]) | (
+                old["present"] & (
+                    (old["date"] != new["date"])
+                    | (old["distance"] != new["distance"])
+                    | (old["cost"] != new["cost"])
+                )
+            )
+            base = leaf_number * LEAF_SIZE
+            removed.append(base + np.flatnonzero(differ & old["present"]))
+            gained = np.flatnonzero(differ & new["present"])
+            added.append((base + gained, new[gained]))
+
+        rows = np.concatenate([rows for _, rows in added]) if added else np.zeros(0, dtype=ROW)
+        return (
+            np.concatenate(removed) if removed else np.zeros(0, dtype=np.int64),
+            {
+                "id": np.concatenate([ids for ids, _ in added]) if added else np.zeros(0, dtype=np.int64),
+                "date": rows["date"].astype("datetime64[D]"),
+                "distance": rows["distance"].copy(),
+                "cost": rows["cost"].copy()
+            }
+        )
+
+    def _leaf(self, leaf_number):
+        node = self.root
+        for level in range(self.depth, 0, -1):
+            if node is None:
+                return None
+            node = node[leaf_number // BRANCH ** (level - 1) % BRANCH]
+        return node
+
+    def _grown(self, size):
+        """This table with enough levels for ids below size"""
+        table = self
+        while table.capacity < size:
+            root = None if table.root is None else (table.root,) + (None,) * (BRANCH - 1)
+            table = RecordTable(root, table.depth + 1, table.count)
+        return table
+
+    def _grown_to(self, depth):
+        return self._grown(LEAF_SIZE * BRANCH ** depth)
+
+    def _replace(self, updates):
+        """Root with the given leaves swapped in, path-copying the branches above them"""
+        return _replace(self.root, self.depth, 0, sorted(updates), updates)
+
+
+def _by_leaf(ids):
+    """(leaf number, positions into ids) for each leaf the ids fall in"""
+    leaves = ids // LEAF_SIZE
+    order = np.argsort(leaves, kind="stable")
+    numbers, starts = np.unique(leaves[order], return_index=True)
+    return zip(numbers.tolist(), np.split(order, starts[1:]))
+
+
+def _replace(node, level, first_leaf, leaf_numbers, updates):
+    if level == 0:
+        return updates[leaf_numbers[0]]
+    span = BRANCH ** (level - 1)
+    children = list(node) if node is not None else [None] * BRANCH
+    for child, numbers in groupby(leaf_numbers, key=lambda number: (number - first_leaf) // span):
+        children[child] = _replace(children[child], level - 1, first_leaf + child * span, list(numbers), updates)
+    return tuple(children)
+
+
+def _diff(old, new, level, first_leaf, pairs):
+    """Collect (leaf number, old leaf, new leaf) for leaves that are not shared"""
+    if old is new:
+        return
+    if level == 0:
+        pairs.append((first_leaf, old, new))
+        return
+    span = BRANCH ** (level - 1)
+    for child in range(BRANCH):
+        _diff(
+            None if old is None else old[child],
+            None if new is None else new[child],
+            level - 1, first_leaf + child * span, pairs
+        )
@@ -0,0 +1,151 @@
+"""Opt-in per-interaction phase timers with JSON and Chrome-trace export"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+
+class Interaction:
+    """One user interaction (a click, a rerun) and the timed phases inside it"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.get_ident()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase; safe to use from worker threads working for this interaction"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases.append((name, start, time.perf_counter(), threading.get_ident()))
+
+    def finish(self):
+        """Close the interaction and add it to the profiler's history"""
+        if self.end is None:
+            self.end = time.perf_counter()
+            self.profiler.history.append(self)
+
+    def as_dict(self):
+        epoch = self.profiler.epoch
+        return {
+            "name": self.name,
+            "start_ms": (self.start - epoch) * 1000,
+            "duration_ms": self.duration * 1000,
+            "phases": [
+                {"name": name, "start_ms": (start - epoch) * 1000, "duration_ms": (end - start) * 1000}
+                for name, start, end, _ in self.phases
+            ]
+        }
+
+
+class NullInteraction:
+    """Stand-in used while profiling is off; every call is a no-op"""
+
+    name = None
+
+    def phase(self, name):
+        return nullcontext()
+
+    def finish(self):
+        pass
+
+
+NULL_INTERACTION = NullInteraction()
+
+
+class Profiler:
+    """Keeps the last `history` interactions; does nothing unless enabled"""
+
+    def __init__(self, enabled=False, history=50):
+        self.enabled = enabled
+        self.history = deque(maxlen=history)
+        self.epoch = time.perf_counter()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls, variable="TRAVEL_PROFILE"):
+        """Profiler enabled when the environment variable is set to a non-empty value"""
+        return cls(enabled=bool(os.environ.get(variable)))
+
+    def start(self, name):
+        """Begin an interaction that finishes later, e.g. after a worker thread completes"""
+        return Interaction(self, name) if self.enabled else NULL_INTERACTION
+
+    @contextmanager
+    def interaction(self, name):
+        """Time an interaction; phase() calls on this thread attach to it meanwhile"""
+        interaction = self.start(name)
+        stack = self._stack()
+        stack.append(interaction)
+        try:
+            yield interaction
+        finally:
+            stack.pop()
+            interaction.finish()
+
+    def phase(self, name):
+        """Time a phase of the interaction active on this thread, if any"""
+        stack = self._stack()
+        return stack[-1].phase(name) if stack else nullcontext()
+
+    def clear(self):
+        """Forget all recorded interactions"""
+        self.history.clear()
+
+    def rows(self):
+        """(interaction, phase, milliseconds) rows, newest interaction first"""
+        rows = []
+        for interaction in reversed(self.history):
+            rows.append((interaction.name, "total", interaction.duration * 1000))
+            rows.extend(
+                (interaction.name, name, (end - start) * 1000) for name, start, end, _ in interaction.phases
+            )
+        return rows
+
+    def to_json(self):
+        """History as JSON, oldest interaction first"""
+        return json.dumps([interaction.as_dict() for interaction in self.history], indent=2)
+
+    def to_chrome_trace(self):
+        """History in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = []
+        for interaction in self.history:
+            events.append(self._event(interaction.name, "interaction", interaction.start,
+                                      interaction.end, pid, interaction.thread))
+            events.extend(
+                self._event(name, interaction.name, start, end, pid, thread)
+                for name, start, end, thread in interaction.phases
+            )
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def _event(self, name, category, start, end, pid, thread):
+        return {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self.epoch) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": pid,
+            "tid": thread
+        }
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
@@ -0,0 +1,165 @@
+"""Vectorized data-quality flags for travel history, checked before forecasting"""
+import numpy as np
+
+# Per-record bit flags
+DUPLICATE = 1          # same date, distance and cost as an earlier record
+SAME_DAY = 2           # another record already exists on this date (informational)
+DISTANCE_OUTLIER = 4
+COST_OUTLIER = 8       # implausible cost per km
+INVALID = 16           # non-finite or non-positive distance, negative cost
+
+# Records with these flags are left out of the distance forecast / the cost-per-km estimate
+EXCLUDE_FROM_FORECAST = DUPLICATE | DISTANCE_OUTLIER | INVALID
+EXCLUDE_FROM_COST = DUPLICATE | COST_OUTLIER | INVALID
+
+# Outlier rules on log scale, where trip lengths and fares are roughly symmetric:
+# modified z-score above MAD_THRESHOLD, or outside Tukey's far-out IQR fences
+MAD_THRESHOLD = 3.5
+MAD_SCALE = 1.4826
+IQR_FENCE = 3.0
+# Fewer records than this give no meaningful spread, so nothing is flagged as an outlier
+MIN_RECORDS = 8
+# Bounds come from an evenly spaced sample of at most this many values, which
+# keeps the medians cheap on long histories without visibly moving them
+BOUNDS_SAMPLE = 1 << 16
+# Bounds are refreshed once this share of records changed since they were computed
+REFRESH_RATIO = 0.05
+
+NO_BOUNDS = (-np.inf, np.inf)
+
+
+def robust_bounds(values, method="mad"):
+    """(low, high) inlier bounds of finite values by the "mad" or "iqr" rule"""
+    values = values[::max(1, len(values) // BOUNDS_SAMPLE)]
+    values = values[np.isfinite(values)]
+    if len(values) < MIN_RECORDS:
+        return NO_BOUNDS
+    if method == "iqr":
+        q1, q3 = np.percentile(values, [25, 75])
+        spread = q3 - q1
+        return (q1 - IQR_FENCE * spread, q3 + IQR_FENCE * spread) if spread > 0 else NO_BOUNDS
+    median = np.median(values)
+    mad = MAD_SCALE * np.median(np.abs(values - median))
+    return (median - MAD_THRESHOLD * mad, median + MAD_THRESHOLD * mad) if mad > 0 else NO_BOUNDS
+
+
+def outside(values, bounds):
+    low, high = bounds
+    return (values < low) | (values > high)
+
+
+def record_hash(days, distance, cost):
+    """64-bit hash of (day, distance, cost) per record"""
+    return (
+        days.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        ^ distance.view(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F)
+        ^ cost.view(np.uint64) * np.uint64(0x165667B19E3779F9)
+    )
+
+
+class QualityCheck:
+    """Flags for a whole history in one vectorized pass, plus O(1) checks of new records
+
+    The outlier bounds of the last full pass are cached and reused for single
+    records until REFRESH_RATIO of the history changed; stale() says when a
+    caller should run check() again.
+    """
+
+    def __init__(self, method="mad"):
+        self.method = method
+        self.distance_bounds = NO_BOUNDS
+        self.cost_bounds = NO_BOUNDS
+        self.checked = 0
+        self.changes = 0
+
+    def check(self, days, distance, cost):
+        """uint8 flags for every record; refreshes the cached bounds"""
+        days = np.asarray(days, dtype=np.int64)
+        distance = np.asarray(distance, dtype=np.float64)
+        cost = np.asarray(cost, dtype=np.float64)
+        flags = np.zeros(len(days), dtype=np.uint8)
+
+        invalid = ~np.isfinite(distance) | ~np.isfinite(cost) | (distance <= 0) | (cost < 0)
+        flags[invalid] |= INVALID
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_distance = np.log(np.where(invalid, np.nan, distance))
+            log_rate = np.log(np.where(invalid, np.nan, cost / distance))
+        self.distance_bounds = robust_bounds(log_distance, self.method)
+        self.cost_bounds = robust_bounds(log_rate, self.method)
+        flags[outside(log_distance, self.distance_bounds)] |= DISTANCE_OUTLIER
+        flags[outside(log_rate, self.cost_bounds)] |= COST_OUTLIER
+
+        # Histories are usually appended in date order, which skips the sort;
+        # exact duplicates are only looked for among records on shared dates
+        in_order = bool(np.all(days[1:] >= days[:-1]))
+        order = np.arange(len(days)) if in_order else np.argsort(days, kind="stable")
+        sorted_days = days[order]
+        repeat = np.zeros(len(days), dtype=bool)
+        repeat[1:] = sorted_days[1:] == sorted_days[:-1]
+        if repeat.any():
+            shared = repeat.copy()
+            shared[:-1] |= repeat[1:]
+            rows = order[shared]
+            # Identical records hash equal, so they end up adjacent; the
+            # comparison below rules out hash collisions
+            rows = rows[np.argsort(record_hash(days[rows], distance[rows], cost[rows]))]
+            same = np.zeros(len(rows), dtype=bool)
+            same[1:] = (
+                (days[rows[1:]] == days[rows[:-1]])
+                & (distance[rows[1:]] == distance[rows[:-1]])
+                & (cost[rows[1:]] == cost[rows[:-1]])
+            )
+            # Of each identical set, the record first in date order stays unflagged
+            if in_order:
+                rank = rows
+            else:
+                position = np.empty(len(days), dtype=np.int64)
+                position[order] = np.arange(len(days))
+                rank = position[rows]
+            starts = np.flatnonzero(~same)
+            first = np.minimum.reduceat(rank, starts)
+            duplicate = rows[rank != first[np.cumsum(~same) - 1]]
+            flags[order[repeat]] |= SAME_DAY
+            flags[duplicate] = (flags[duplicate] | DUPLICATE) & ~np.uint8(SAME_DAY)
+
+        self.checked = len(days)
+        self.changes = 0
+        return flags
+
+    def check_one(self, distance, cost, same_day_distance=(), same_day_cost=()):
+        """Flags for one new record against the cached bounds and the records on its date"""
+        self.changes += 1
+        if not (np.isfinite(distance) and np.isfinite(cost)) or distance <= 0 or cost < 0:
+            return INVALID
+        flags = 0
+        if outside(np.log(distance), self.distance_bounds):
+            flags |= DISTANCE_OUTLIER
+        if outside(np.log(cost / distance), self.cost_bounds):
+            flags |= COST_OUTLIER
+        same_day_distance = np.asarray(same_day_distance, dtype=np.float64)
+        same_day_cost = np.asarray(same_day_cost, dtype=np.float64)
+        if np.any((same_day_distance == distance) & (same_day_cost == cost)):
+            flags |= DUPLICATE
+        elif len(same_day_distance):
+            flags |= SAME_DAY
+        return flags
+
+    def changed(self, count=1):
+        """Note records removed or replaced since the last full check"""
+        self.changes += count
+
+    def stale(self):
+        """Whether enough changed since check() that the bounds should be recomputed"""
+        return self.changes > max(1, REFRESH_RATIO * self.checked)
+
+
+def describe(flags):
+    """Short human-readable reasons for one record's flags"""
+    reasons = (
+        (INVALID, "invalid values"),
+        (DUPLICATE, "duplicate entry"),
+        (DISTANCE_OUTLIER, "unusual distance"),
+        (COST_OUTLIER, "unusual cost per km"),
+        (SAME_DAY, "another trip on this date")
+    )
+    return [text for flag, text in reasons if flags & flag]
@@ -0,0 +1,94 @@
+"""Vectorized cost, emission and environmental-impact engine driven by rate tables"""
+import json
+
+import numpy as np
+
+DEFAULT_COST_PER_KM = 75  # ₹ per km
+DEFAULT_EMISSION_PER_KM = 125  # g CO₂ per km
+TREE_CO2_PER_YEAR = 22000  # Approximate g CO₂ absorbed by one tree per year
+CAR_CO2_PER_KM = 404  # Average car g CO₂ per km
+
+
+def normalize(name):
+    """Rate table lookup key for a vehicle model or city name"""
+    return str(name).strip().lower()
+
+
+class RateTable:
+    """Per-km cost and emission rates keyed by vehicle model and city
+
+    A vehicle entry sets its cost and emission per km; a city entry scales
+    cost (local fuel prices). Unknown vehicles and cities use the defaults.
+    """
+
+    def __init__(self, cost_per_km=DEFAULT_COST_PER_KM, emission_per_km=DEFAULT_EMISSION_PER_KM,
+                 vehicles=None, cities=None):
+        self.cost_per_km = cost_per_km
+        self.emission_per_km = emission_per_km
+        self.vehicles = {normalize(name): rates for name, rates in (vehicles or {}).items()}
+        self.cities = {normalize(name): factor for name, factor in (cities or {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        """Read a JSON rate table with optional vehicles and cities sections"""
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(
+            cost_per_km=config.get("cost_per_km", DEFAULT_COST_PER_KM),
+            emission_per_km=config.get("emission_per_km", DEFAULT_EMISSION_PER_KM),
+            vehicles=config.get("vehicles"),
+            cities=config.get("cities")
+        )
+
+    def vehicle_rates(self, vehicle):
+        """(cost per km, emission per km) for one vehicle, before city scaling"""
+        rates = self.vehicles.get(normalize(vehicle), {})
+        return (
+            rates.get("cost_per_km", self.cost_per_km),
+            rates.get("emission_per_km", self.emission_per_km)
+        )
+
+    def city_factor(self, city):
+        """Cost multiplier for one city"""
+        return self.cities.get(normalize(city), 1.0)
+
+    def compute(self, km, vehicle, city):
+        """Cost and emission for scalar or array km
+
+        vehicle and city may be single names or arrays aligned with km; each
+        distinct name is looked up once and the rest is one NumPy pass.
+        """
+        km = np.asarray(km, dtype=np.float64)
+        cost_rate, emission_rate = self._rates(vehicle, city, km.shape)
+        cost = km * cost_rate
+        emission = km * emission_rate
+        if km.ndim == 0:
+            return float(cost), float(emission)
+        return cost, emission
+
+    def _rates(self, vehicle, city, shape):
+        if isinstance(vehicle, str) and isinstance(city, str):
+            cost_rate, emission_rate = self.vehicle_rates(vehicle)
+            return cost_rate * self.city_factor(city), emission_rate
+
+        vehicle = np.broadcast_to(np.asarray(vehicle, dtype=object), shape).astype(str)
+        city = np.broadcast_to(np.asarray(city, dtype=object), shape).astype(str)
+        vehicles, vehicle_codes = np.unique(vehicle, return_inverse=True)
+        cities, city_codes = np.unique(city, return_inverse=True)
+        vehicle_table = np.array([self.vehicle_rates(name) for name in vehicles], dtype=np.float64)
+        vehicle_table = vehicle_table.reshape(-1, 2)
+        city_table = np.array([self.city_factor(name) for name in cities], dtype=np.float64)
+
+        cost_rate = vehicle_table[vehicle_codes, 0] * city_table[city_codes]
+        emission_rate = vehicle_table[vehicle_codes, 1]
+        return cost_rate.reshape(shape), emission_rate.reshape(shape)
+
+
+def environmental_impact(emission):
+    """Trees needed to offset, and equivalent car km, for scalar or array grams of CO₂"""
+    emission = np.asarray(emission, dtype=np.float64)
+    trees_needed = np.round(emission / TREE_CO2_PER_YEAR, 2)
+    car_equivalent = np.round(emission / CAR_CO2_PER_KM, 2)
+    if emission.ndim == 0:
+        return float(trees_needed), float(car_equivalent)
+    return trees_needed, car_equivalent
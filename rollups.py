@@ -0,0 +1,161 @@
+"""Daily, ISO-weekly and monthly travel aggregates maintained incrementally"""
+import numpy as np
+
+from forecasting import weekday
+
+METRICS = ("distance", "cost", "emission")
+# Extra days allocated whenever the covered calendar grows
+GROWTH_DAYS = 366
+
+
+class Rollups:
+    """Count, sum, min and max of each metric per day, ISO week and month
+
+    Days live in dense arrays over the covered calendar and are updated with
+    ufunc.at on insert and delete, so reads cost O(days in range) however
+    many records there are. A delete cannot shrink a min or max, so days
+    whose extreme was removed are recomputed from day_values(day), a (k, 3)
+    array of that day's remaining records, the next time they are read.
+    Weeks and months are reduced from the days on read.
+    """
+
+    def __init__(self, day_values=None):
+        self.day_values = day_values
+        self.origin = None
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sum = np.zeros((0, len(METRICS)))
+        self.min = np.zeros((0, len(METRICS)))
+        self.max = np.zeros((0, len(METRICS)))
+        self._stale = set()
+
+    def add(self, days, values):
+        """Add records given day numbers and a mapping of metric arrays (missing metrics are 0)"""
+        days, values = self._columns(days, values)
+        if not len(days):
+            return
+        self._cover(int(days.min()), int(days.max()))
+        offsets = days - self.origin
+        np.add.at(self.count, offsets, 1)
+        np.add.at(self.sum, offsets, values)
+        np.minimum.at(self.min, offsets, values)
+        np.maximum.at(self.max, offsets, values)
+
+    def remove(self, days, values):
+        """Remove previously added records"""
+        days, values = self._columns(days, values)
+        if not len(days):
+            return
+        offsets = days - self.origin
+        np.subtract.at(self.count, offsets, 1)
+        np.subtract.at(self.sum, offsets, values)
+
+        extremes = (values <= self.min[offsets]) | (values >= self.max[offsets])
+        self._stale.update((offsets[extremes.any(axis=1)] + self.origin).tolist())
+        emptied = offsets[self.count[offsets] == 0]
+        self._clear(emptied)
+        self._stale.difference_update((emptied + self.origin).tolist())
+
+    def totals(self, start=None, end=None):
+        """Record count and metric sums over days start..end inclusive (default: everything)"""
+        lo, hi = self._slice(start, end)
+        sums = self.sum[lo:hi].sum(axis=0)
+        totals = {"count": int(self.count[lo:hi].sum())}
+        totals.update(zip(METRICS, sums.tolist()))
+        return totals
+
+    def daily(self, start=None, end=None):
+        """Per-day aggregates over start..end; days without records have NaN min/max"""
+        lo, hi = self._slice(start, end)
+        return self._table(self._day_numbers(lo, hi), np.arange(hi - lo), lo, hi)
+
+    def weekly(self, start=None, end=None):
+        """Per-ISO-week aggregates labelled by their Monday (edge weeks are clipped to start..end)"""
+        lo, hi = self._slice(start, end)
+        days = self._day_numbers(lo, hi)
+        return self._periods(days - weekday(days), lo, hi)
+
+    def monthly(self, start=None, end=None):
+        """Per-month aggregates labelled by their first day (edge months are clipped to start..end)"""
+        lo, hi = self._slice(start, end)
+        months = self._day_numbers(lo, hi).astype("datetime64[D]").astype("datetime64[M]")
+        return self._periods(months.astype("datetime64[D]").astype(np.int64), lo, hi)
+
+    def _periods(self, keys, lo, hi):
+        if not len(keys):
+            return self._table(keys, keys, lo, hi)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        return self._table(keys[starts], starts, lo, hi)
+
+    def _table(self, labels, starts, lo, hi):
+        """Reduce days [lo, hi) into periods beginning at the given offsets from lo"""
+        self._refresh(lo, hi)
+        table = {"period": np.asarray(labels, dtype=np.int64).astype("datetime64[D]")}
+        if not len(starts):
+            table["count"] = np.zeros(0, dtype=np.int64)
+            for name in METRICS:
+                table[f"{name}_sum"] = table[f"{name}_min"] = table[f"{name}_max"] = np.zeros(0)
+            return table
+
+        table["count"] = np.add.reduceat(self.count[lo:hi], starts)
+        sums = np.add.reduceat(self.sum[lo:hi], starts)
+        mins = np.minimum.reduceat(self.min[lo:hi], starts)
+        maxs = np.maximum.reduceat(self.max[lo:hi], starts)
+        empty = table["count"] == 0
+        mins[empty] = maxs[empty] = np.nan
+        for i, name in enumerate(METRICS):
+            table[f"{name}_sum"] = sums[:, i]
+            table[f"{name}_min"] = mins[:, i]
+            table[f"{name}_max"] = maxs[:, i]
+        return table
+
+    def _refresh(self, lo, hi):
+        """Recompute min/max of stale days in [lo, hi) from the remaining records"""
+        if not self._stale or self.day_values is None:
+            return
+        for day in [day for day in self._stale if lo <= day - self.origin < hi]:
+            values = np.asarray(self.day_values(day), dtype=np.float64).reshape(-1, len(METRICS))
+            offset = day - self.origin
+            self.min[offset] = values.min(axis=0) if len(values) else np.inf
+            self.max[offset] = values.max(axis=0) if len(values) else -np.inf
+            self._stale.discard(day)
+
+    def _slice(self, start, end):
+        """Array offsets [lo, hi) for day numbers start..end, clamped to the populated days"""
+        populated = np.flatnonzero(self.count)
+        if not len(populated):
+            return 0, 0
+        lo = populated[0] if start is None else max(int(start) - self.origin, 0)
+        hi = populated[-1] + 1 if end is None else min(int(end) - self.origin + 1, len(self.count))
+        return int(lo), int(max(hi, lo))
+
+    def _day_numbers(self, lo, hi):
+        return np.arange(lo, hi, dtype=np.int64) + (self.origin or 0)
+
+    def _cover(self, first, last):
+        """Grow the dense day arrays so first..last are addressable"""
+        if self.origin is None:
+            self.origin = first
+        before = max(self.origin - first, 0)
+        after = max(last - (self.origin + len(self.count) - 1), 0)
+        if not before and not after:
+            return
+        before += GROWTH_DAYS if before else 0
+        after += GROWTH_DAYS if after else 0
+        self.count = np.pad(self.count, (before, after))
+        self.sum = np.pad(self.sum, ((before, after), (0, 0)))
+        self.min = np.pad(self.min, ((before, after), (0, 0)), constant_values=np.inf)
+        self.max = np.pad(self.max, ((before, after), (0, 0)), constant_values=-np.inf)
+        self.origin -= before
+
+    def _clear(self, offsets):
+        self.sum[offsets] = 0.0
+        self.min[offsets] = np.inf
+        self.max[offsets] = -np.inf
+
+    def _columns(self, days, values):
+        days = np.atleast_1d(np.asarray(days, dtype=np.int64))
+        columns = np.zeros((len(days), len(METRICS)))
+        for i, name in enumerate(METRICS):
+            if name in values:
+                columns[:, i] = values[name]
+        return days, columns
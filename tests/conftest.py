@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app modules live at the repository root. Append rather than prepend:
+# the Streamlit script code.py must not shadow the stdlib code module.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
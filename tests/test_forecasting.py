@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from forecasting import SeasonalTrendModel, weekday
+
+
+def sklearn_predict(days, values, queries):
+    """Least-squares trend plus weekday offsets, fitted by sklearn"""
+    def features(d):
+        return np.column_stack([d, weekday(d)[:, None] == np.arange(1, 7)]).astype(np.float64)
+
+    return LinearRegression().fit(features(days), values).predict(features(queries))
+
+
+def random_history(rng, count):
+    days = rng.integers(18_000, 20_000, count)
+    values = 0.01 * (days - 18_000) + 3.0 * (weekday(days) >= 5) + rng.normal(0, 4, count)
+    return days, values
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_sklearn_on_random_data(seed):
+    rng = np.random.default_rng(seed)
+    days, values = random_history(rng, 500)
+    queries = rng.integers(18_000, 21_000, 50)
+
+    model = SeasonalTrendModel()
+    model.add(days, values)
+
+    np.testing.assert_allclose(model.predict(queries), sklearn_predict(days, values, queries), rtol=1e-9)
+
+
+def test_single_adds_match_batch_add():
+    rng = np.random.default_rng(7)
+    days, values = random_history(rng, 200)
+    queries = np.arange(19_990, 20_010)
+
+    model = SeasonalTrendModel()
+    for day, value in zip(days, values):
+        model.add(day, value)
+
+    np.testing.assert_allclose(model.predict(queries), sklearn_predict(days, values, queries), rtol=1e-9)
+
+
+def test_remove_round_trips():
+    rng = np.random.default_rng(3)
+    days, values = random_history(rng, 400)
+    extra_days, extra_values = random_history(rng, 100)
+    queries = rng.integers(18_000, 21_000, 50)
+
+    model = SeasonalTrendModel()
+    model.add(days, values)
+    model.add(extra_days, extra_values)
+    np.testing.assert_allclose(
+        model.predict(queries),
+        sklearn_predict(np.r_[days, extra_days], np.r_[values, extra_values], queries),
+        rtol=1e-9
+    )
+
+    # Removing records one at a time and in a batch leaves the fit of the rest
+    for day, value in zip(extra_days[:50], extra_values[:50]):
+        model.remove(day, value)
+    model.remove(extra_days[50:], extra_values[50:])
+    assert model.n == len(days)
+    np.testing.assert_allclose(model.predict(queries), sklearn_predict(days, values, queries), rtol=1e-9)
+
+
+def test_removing_everything_resets():
+    rng = np.random.default_rng(11)
+    days, values = random_history(rng, 30)
+    model = SeasonalTrendModel()
+    model.add(days, values)
+    model.remove(days, values)
+
+    assert model.n == 0
+    assert model.origin is None
+    np.testing.assert_array_equal(model.predict([18_000, 18_010]), [0.0, 0.0])
+
+    # Later adds start a new fit from scratch
+    later_days, later_values = random_history(rng, 60)
+    model.add(later_days, later_values)
+    np.testing.assert_allclose(
+        model.predict(later_days), sklearn_predict(later_days, later_values, later_days), rtol=1e-9
+    )
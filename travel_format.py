@@ -0,0 +1,131 @@
+"""Versioned columnar binary file format for travel record snapshots
+
+Layout (little-endian):
+
+    header      magic, version, flags, record count, next id, column count
+    directory   per column: name, dtype, data offset, stored length, crc32
+    header crc  crc32 of header + directory
+    data        one block per column, each starting on a 64-byte boundary
+
+Uncompressed files are read with numpy.memmap, so loading does not copy or
+parse the columns. With FLAG_ZLIB each block is zlib-compressed instead.
+"""
+import os
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"TRVLCOL\0"
+VERSION = 1
+FLAG_ZLIB = 1
+
+HEADER = struct.Struct("<8sHHQQH")
+COLUMN_ENTRY = struct.Struct("<16s8sQQI")
+CRC = struct.Struct("<I")
+ALIGNMENT = 64
+
+# Column name -> on-disk dtype; dates are int64 days since 1970-01-01
+SCHEMA = {
+    "id": "<i8",
+    "date": "<i8",
+    "distance": "<f8",
+    "cost": "<f8"
+}
+
+
+class FormatError(ValueError):
+    """The file is not a readable snapshot of this schema"""
+
+
+def empty():
+    """Columns of a snapshot with no records"""
+    return as_columns({name: np.zeros(0, dtype=dtype) for name, dtype in SCHEMA.items()})
+
+
+def as_columns(raw):
+    """On-disk columns as the journal hands them out (dates as datetime64[D])"""
+    columns = dict(raw)
+    columns["date"] = columns["date"].view("datetime64[D]")
+    return columns
+
+
+def write(f, columns, next_id, compress=False):
+    """Write a snapshot of the SCHEMA columns of `columns` to an open binary file"""
+    blocks = []
+    for name, dtype in SCHEMA.items():
+        values = np.asarray(columns[name])
+        if name == "date":
+            values = values.astype("datetime64[D]").view(np.int64)
+        data = np.ascontiguousarray(values, dtype=dtype).tobytes()
+        if compress:
+            data = zlib.compress(data, 1)
+        blocks.append((name, dtype, data))
+    count = len(columns["id"])
+
+    offset = _align(HEADER.size + COLUMN_ENTRY.size * len(blocks) + CRC.size)
+    header = HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0, count, next_id, len(blocks))
+    layout = []
+    for name, dtype, data in blocks:
+        header += COLUMN_ENTRY.pack(name.encode(), dtype.encode(), offset, len(data), zlib.crc32(data))
+        layout.append((offset, data))
+        offset = _align(offset + len(data))
+    f.write(header + CRC.pack(zlib.crc32(header)))
+
+    position = len(header) + CRC.size
+    for offset, data in layout:
+        f.write(b"\0" * (offset - position) + data)
+        position = offset + len(data)
+
+
+def read(path, mmap=True, verify=True):
+    """(columns, next_id) from a snapshot file; uncompressed columns are memory-mapped"""
+    with open(path, "rb") as f:
+        fixed = f.read(HEADER.size)
+        if len(fixed) < HEADER.size:
+            raise FormatError(f"{path}: truncated header")
+        magic, version, flags, count, next_id, ncolumns = HEADER.unpack(fixed)
+        if magic != MAGIC:
+            raise FormatError(f"{path}: not a travel snapshot")
+        if version > VERSION:
+            raise FormatError(f"{path}: format version {version} is newer than supported {VERSION}")
+
+        directory = f.read(COLUMN_ENTRY.size * ncolumns)
+        stored_crc = f.read(CRC.size)
+        if len(stored_crc) < CRC.size or CRC.unpack(stored_crc)[0] != zlib.crc32(fixed + directory):
+            raise FormatError(f"{path}: corrupt header")
+        entries = {}
+        for i in range(ncolumns):
+            name, dtype, offset, length, crc = COLUMN_ENTRY.unpack_from(directory, i * COLUMN_ENTRY.size)
+            entries[name.rstrip(b"\0").decode()] = (dtype.rstrip(b"\0").decode(), offset, length, crc)
+        if {name: entry[0] for name, entry in entries.items()} != SCHEMA:
+            raise FormatError(f"{path}: unexpected columns {sorted(entries)}")
+
+        size = os.fstat(f.fileno()).st_size
+        raw = {}
+        for name, (dtype, offset, length, crc) in entries.items():
+            if offset + length > size:
+                raise FormatError(f"{path}: column {name} is truncated")
+            if flags & FLAG_ZLIB:
+                f.seek(offset)
+                data = f.read(length)
+                if verify and zlib.crc32(data) != crc:
+                    raise FormatError(f"{path}: corrupt column {name}")
+                values = np.frombuffer(zlib.decompress(data), dtype=dtype)
+            elif not count:
+                values = np.zeros(0, dtype=dtype)
+            elif mmap:
+                values = np.memmap(f, dtype=dtype, mode="r", offset=offset, shape=count)
+            else:
+                f.seek(offset)
+                values = np.frombuffer(f.read(length), dtype=dtype)
+            if len(values) != count or values.nbytes != count * np.dtype(dtype).itemsize:
+                raise FormatError(f"{path}: column {name} has {len(values)} of {count} values")
+            if verify and not flags & FLAG_ZLIB and zlib.crc32(values) != crc:
+                raise FormatError(f"{path}: corrupt column {name}")
+            raw[name] = values
+    return as_columns(raw), next_id
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
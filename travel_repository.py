@@ -0,0 +1,330 @@
+"""SQLite-backed repository of riders and their daily travel"""
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+
+from travel_store import TravelStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER,
+    vehicle TEXT NOT NULL,
+    city TEXT NOT NULL,
+    UNIQUE (name, vehicle, city)
+);
+CREATE TABLE IF NOT EXISTS trips (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    date TEXT NOT NULL,
+    traveled INTEGER NOT NULL DEFAULT 0,
+    destination TEXT NOT NULL DEFAULT '',
+    km REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    emission REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trips_by_date ON trips (date, user_id);
+"""
+
+UPSERT_TRIP = """
+INSERT INTO trips (user_id, date, traveled, destination, km, cost, emission)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, date) DO UPDATE SET
+    traveled = excluded.traveled,
+    destination = excluded.destination,
+    km = excluded.km,
+    cost = excluded.cost,
+    emission = excluded.emission
+"""
+
+# Imported trips add to the day: several trips on one date accumulate
+IMPORT_TRIP = """
+INSERT INTO trips (user_id, date, traveled, destination, km, cost, emission)
+VALUES (?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (user_id, date) DO UPDATE SET
+    destination = CASE WHEN traveled AND destination != '' THEN destination ELSE excluded.destination END,
+    km = CASE WHEN traveled THEN km ELSE 0 END + excluded.km,
+    cost = CASE WHEN traveled THEN cost ELSE 0 END + excluded.cost,
+    emission = CASE WHEN traveled THEN emission ELSE 0 END + excluded.emission,
+    traveled = 1
+"""
+
+# Sort keys of the history log -> trips column; user input never reaches the SQL text
+LOG_SORT_COLUMNS = {
+    "date": "date",
+    "destination": "destination",
+    "distance": "km",
+    "cost": "cost",
+    "emission": "emission"
+}
+
+
+class TravelRepository:
+    """Users and trips in one SQLite file, served from a small connection pool"""
+
+    def __init__(self, path="travel_tracker.db", pool_size=4):
+        self.path = path
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; commits on success, rolls back on error"""
+        conn = self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def get_or_create_user(self, name, age, vehicle, city):
+        """Id of the rider with this name, vehicle and city, creating it if needed"""
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO users (name, age, vehicle, city) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, vehicle, city) DO UPDATE SET age = excluded.age",
+                (name, age, vehicle, city)
+            )
+            return conn.execute(
+                "SELECT id FROM users WHERE name = ? AND vehicle = ? AND city = ?",
+                (name, vehicle, city)
+            ).fetchone()[0]
+
+    def load_week(self, user_id, week_start):
+        """Seven-row TravelStore (id = weekday) for the week starting on week_start"""
+        week = TravelStore(capacity=7)
+        week.append(
+            ids=np.arange(7),
+            date=np.datetime64(week_start) + np.arange(7),
+            distance=0,
+            cost=0,
+            emission=0,
+            traveled=False
+        )
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT date, traveled, destination, km, cost, emission FROM trips "
+                "WHERE user_id = ? AND date BETWEEN ? AND ?",
+                (user_id, week_start.isoformat(), (week_start + timedelta(days=6)).isoformat())
+            ).fetchall()
+        for day, traveled, destination, km, cost, emission in rows:
+            weekday = (np.datetime64(day) - np.datetime64(week_start)).astype(int)
+            week.update(
+                weekday,
+                traveled=bool(traveled),
+                destination=destination,
+                distance=km,
+                cost=cost,
+                emission=emission
+            )
+        return week
+
+    def save_trips(self, user_id, store, rows):
+        """Upsert the given store rows for a user with a single executemany"""
+        rows = np.asarray(rows, dtype=np.int64)
+        params = zip(
+            [user_id] * len(rows),
+            store["date"][rows].astype(str).tolist(),
+            store["traveled"][rows].astype(int).tolist(),
+            store.destination_names(rows).tolist(),
+            store["distance"][rows].tolist(),
+            store["cost"][rows].tolist(),
+            store["emission"][rows].tolist()
+        )
+        with self.connection() as conn:
+            conn.executemany(UPSERT_TRIP, params)
+
+    def import_trips(self, user_id, chunk):
+        """Add a column chunk from bulk_io to a user's traveled days; returns the dates written
+
+        Trips sharing a date are summed into one row, and a day that already
+        has travel keeps it and gains the imported trips on top.
+        """
+        dates, first, inverse = np.unique(chunk["date"], return_index=True, return_inverse=True)
+        destination = chunk.get("destination")
+        params = zip(
+            [user_id] * len(dates),
+            dates.astype(str).tolist(),
+            destination[first].tolist() if destination is not None else [""] * len(dates),
+            *(
+                np.bincount(inverse, weights=chunk[name], minlength=len(dates)).tolist()
+                for name in ("distance", "cost", "emission")
+            )
+        )
+        with self.connection() as conn:
+            conn.executemany(IMPORT_TRIP, params)
+        return dates
+
+    def iter_trips(self, user_id, chunk_size=10_000):
+        """Stream a user's traveled days in date order as bulk_io column chunks"""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT date, km, cost, emission, destination FROM trips "
+                "WHERE user_id = ? AND traveled = 1 ORDER BY date",
+                (user_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                dates, distance, cost, emission, destination = zip(*rows)
+                yield {
+                    "date": np.array(dates, dtype="datetime64[D]"),
+                    "distance": np.array(distance, dtype=np.float64),
+                    "cost": np.array(cost, dtype=np.float64),
+                    "emission": np.array(emission, dtype=np.float64),
+                    "destination": np.array(destination, dtype=object)
+                }
+
+    def user_id_range(self):
+        """Smallest and largest user id, or (0, -1) when there are no riders"""
+        with self.connection() as conn:
+            first, last = conn.execute("SELECT MIN(id), MAX(id) FROM users").fetchone()
+        return (0, -1) if first is None else (first, last)
+
+    def users_between(self, first_id, last_id):
+        """Riders with ids first_id..last_id inclusive as column arrays, in id order"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT id, name, vehicle, city FROM users WHERE id BETWEEN ? AND ? ORDER BY id",
+                (first_id, last_id)
+            ).fetchall()
+        ids, names, vehicles, cities = zip(*rows) if rows else ((), (), (), ())
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "name": np.array(names, dtype=object),
+            "vehicle": np.array(vehicles, dtype=object),
+            "city": np.array(cities, dtype=object)
+        }
+
+    def trips_between(self, first_id, last_id):
+        """Traveled days of riders first_id..last_id as column arrays ordered by user and date"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT user_id, date, km, cost, emission FROM trips "
+                "WHERE user_id BETWEEN ? AND ? AND traveled = 1 ORDER BY user_id, date",
+                (first_id, last_id)
+            ).fetchall()
+        user_ids, dates, km, cost, emission = zip(*rows) if rows else ((), (), (), (), ())
+        return {
+            "user_id": np.array(user_ids, dtype=np.int64),
+            "date": np.array(dates, dtype="datetime64[D]"),
+            "distance": np.array(km, dtype=np.float64),
+            "cost": np.array(cost, dtype=np.float64),
+            "emission": np.array(emission, dtype=np.float64)
+        }
+
+    def reprice(self, rates, chunk_size=50_000):
+        """Recompute cost and emission of every traveled day under a new RateTable"""
+        updated = 0
+        last = (-1, "")
+        with self.connection() as conn:
+            # Keyset pagination over the primary key keeps memory bounded per chunk
+            while True:
+                rows = conn.execute(
+                    "SELECT t.user_id, t.date, t.km, u.vehicle, u.city "
+                    "FROM trips t JOIN users u ON u.id = t.user_id "
+                    "WHERE t.traveled = 1 AND (t.user_id, t.date) > (?, ?) "
+                    "ORDER BY t.user_id, t.date LIMIT ?",
+                    (*last, chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+                user_ids, dates, km, vehicles, cities = zip(*rows)
+                cost, emission = rates.compute(
+                    np.array(km, dtype=np.float64),
+                    np.array(vehicles, dtype=object),
+                    np.array(cities, dtype=object)
+                )
+                conn.executemany(
+                    "UPDATE trips SET cost = ?, emission = ? WHERE user_id = ? AND date = ?",
+                    zip(cost.tolist(), emission.tolist(), user_ids, dates)
+                )
+                updated += len(rows)
+                last = (user_ids[-1], dates[-1])
+        return updated
+
+    def count_log(self, user_id, **filters):
+        """Number of traveled days matching the history log filters"""
+        where, params = self._log_filter(user_id, **filters)
+        with self.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM trips WHERE {where}", params).fetchone()[0]
+
+    def log_page(self, user_id, page=0, page_size=50, sort="date", descending=True, **filters):
+        """One page of a user's traveled days as column arrays, filtered and sorted in SQL
+
+        filters: start and end dates (inclusive), destination (substring,
+        case-insensitive) and min_km.
+        """
+        column = LOG_SORT_COLUMNS[sort]
+        direction = "DESC" if descending else "ASC"
+        where, params = self._log_filter(user_id, **filters)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT date, destination, km, cost, emission FROM trips WHERE {where} "
+                f"ORDER BY {column} {direction}, date {direction} LIMIT ? OFFSET ?",
+                (*params, page_size, page * page_size)
+            ).fetchall()
+        dates, destination, km, cost, emission = zip(*rows) if rows else ((),) * 5
+        return {
+            "date": np.array(dates, dtype="datetime64[D]"),
+            "destination": np.array(destination, dtype=object),
+            "distance": np.array(km, dtype=np.float64),
+            "cost": np.array(cost, dtype=np.float64),
+            "emission": np.array(emission, dtype=np.float64)
+        }
+
+    def _log_filter(self, user_id, start=None, end=None, destination=None, min_km=None):
+        clauses = ["user_id = ?", "traveled = 1"]
+        params = [user_id]
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end.isoformat())
+        if destination:
+            escaped = destination.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("destination LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if min_km:
+            clauses.append("km >= ?")
+            params.append(min_km)
+        return " AND ".join(clauses), params
+
+    def week_totals_by_rider(self, week_start):
+        """Totals of every rider who traveled in the week starting on week_start, with their city and vehicle"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT t.user_id, u.city, u.vehicle, SUM(t.km), SUM(t.cost), SUM(t.emission) "
+                "FROM trips t JOIN users u ON u.id = t.user_id "
+                "WHERE t.traveled = 1 AND t.date BETWEEN ? AND ? GROUP BY t.user_id",
+                (week_start.isoformat(), (week_start + timedelta(days=6)).isoformat())
+            ).fetchall()
+        user_ids, cities, vehicles, km, cost, emission = zip(*rows) if rows else ((),) * 6
+        return {
+            "user_id": np.array(user_ids, dtype=np.int64),
+            "city": np.array(cities, dtype=object),
+            "vehicle": np.array(vehicles, dtype=object),
+            "distance": np.array(km, dtype=np.float64),
+            "cost": np.array(cost, dtype=np.float64),
+            "emission": np.array(emission, dtype=np.float64)
+        }
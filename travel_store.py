@@ -0,0 +1,197 @@
+"""Columnar NumPy-backed store for travel records"""
+import hashlib
+
+import numpy as np
+
+# rows() lookups of more than DENSE_LOOKUP ids that cover at least 1/DENSE_SHARE
+# of the store go through a dense id -> row table
+DENSE_LOOKUP = 4096
+DENSE_SHARE = 8
+
+
+class TravelStore:
+    """Travel records kept in contiguous typed arrays, one per column"""
+
+    COLUMNS = {
+        "id": np.int64,
+        "date": "datetime64[D]",
+        "distance": np.float64,
+        "cost": np.float64,
+        "emission": np.float64,
+        "destination": np.int32,
+        "traveled": np.bool_,
+        # quality.py bit flags
+        "flags": np.uint8
+    }
+
+    def __init__(self, capacity=64):
+        self._n = 0
+        self._cols = {
+            name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()
+        }
+        self.next_id = 0
+        # While ids stay ascending in storage order, id lookups are a binary search
+        self._ids_sorted = True
+        # Dictionary encoding for destinations; code 0 is the empty destination
+        self.destinations = [""]
+        self._destination_codes = {"": 0}
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build a store from a mapping of column arrays, such as a loaded journal"""
+        columns = dict(columns)
+        ids = columns.pop("id", None)
+        store = cls(capacity=max(len(columns["date"]), 64))
+        if len(columns["date"]):
+            store.append(ids=ids, **columns)
+        return store
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, name):
+        """Read-only view of a column, without copying"""
+        view = self._cols[name][:self._n]
+        view.flags.writeable = False
+        return view
+
+    def fingerprint(self):
+        """Content hash of the stored records, for use as a cache key"""
+        digest = hashlib.blake2b(digest_size=16)
+        for col in self._cols.values():
+            digest.update(col[:self._n].tobytes())
+        digest.update("\0".join(self.destinations).encode())
+        return digest.hexdigest()
+
+    def append(self, date, distance, cost, emission=0.0, destination="", traveled=True, flags=0, ids=None):
+        """Append one or many records; scalars broadcast to the batch size"""
+        dates = np.atleast_1d(np.asarray(date, dtype="datetime64[D]"))
+        count = len(dates)
+        if ids is None:
+            ids = np.arange(self.next_id, self.next_id + count)
+        ids = np.broadcast_to(np.asarray(ids, dtype=np.int64), count)
+
+        if count and (self._n and ids[0] <= self._cols["id"][self._n - 1] or np.any(np.diff(ids) <= 0)):
+            self._ids_sorted = False
+
+        self._reserve(self._n + count)
+        end = self._n + count
+        cols = self._cols
+        cols["id"][self._n:end] = ids
+        cols["date"][self._n:end] = dates
+        cols["distance"][self._n:end] = distance
+        cols["cost"][self._n:end] = cost
+        cols["emission"][self._n:end] = emission
+        cols["destination"][self._n:end] = self.encode_destinations(destination)
+        cols["traveled"][self._n:end] = traveled
+        cols["flags"][self._n:end] = flags
+        self._n = end
+        self.next_id = max(self.next_id, int(ids.max()) + 1)
+        return ids
+
+    def delete(self, ids):
+        """Delete records by id and return how many were removed"""
+        keep = ~np.isin(self._cols["id"][:self._n], ids)
+        kept = int(keep.sum())
+        removed = self._n - kept
+        if removed:
+            for col in self._cols.values():
+                col[:kept] = col[:self._n][keep]
+            self._n = kept
+        return removed
+
+    def update(self, record_id, **values):
+        """Overwrite fields of a single record in place"""
+        row = self.row(record_id)
+        for name, value in values.items():
+            if name == "destination":
+                value = self.encode_destinations(value)
+            self._cols[name][row] = value
+
+    def assign(self, name, values):
+        """Overwrite a whole column, e.g. with freshly computed flags"""
+        self._cols[name][:self._n] = values
+
+    def row(self, record_id):
+        """Row position of a record id"""
+        return int(self.rows([record_id])[0])
+
+    def rows(self, ids):
+        """Row positions of many record ids"""
+        ids = np.asarray(ids, dtype=np.int64)
+        col = self._cols["id"][:self._n]
+        if not self._n and len(ids):
+            raise KeyError(int(ids[0]))
+        if len(ids) > DENSE_LOOKUP and len(ids) * DENSE_SHARE >= self._n:
+            # An id -> row table is O(n) to build, cheaper than a binary search
+            # per id once a batch covers a good part of the store
+            table = np.full(self.next_id, self._n, dtype=np.int64)
+            table[col] = np.arange(self._n)
+            known = (ids >= 0) & (ids < self.next_id)
+            rows = np.full(len(ids), self._n, dtype=np.int64)
+            rows[known] = table[ids[known]]
+            if not (rows < self._n).all():
+                raise KeyError(int(ids[rows == self._n][0]))
+            return rows
+        if self._ids_sorted:
+            rows = np.searchsorted(col, ids)
+        else:
+            sorter = np.argsort(col)
+            rows = sorter[np.minimum(np.searchsorted(col, ids, sorter=sorter), max(self._n - 1, 0))]
+        found = rows < self._n
+        found[found] = col[rows[found]] == ids[found]
+        if not found.all():
+            raise KeyError(int(ids[~found][0]))
+        return rows
+
+    def order(self, by="date", reverse=False):
+        """Row positions that sort the store by a column"""
+        order = np.argsort(self._cols[by][:self._n], kind="stable")
+        return order[::-1] if reverse else order
+
+    def sort(self, by="date", reverse=False):
+        """Reorder all columns in place by one column"""
+        order = self.order(by, reverse)
+        for col in self._cols.values():
+            col[:self._n] = col[:self._n][order]
+        self._ids_sorted = by == "id" and not reverse
+
+    def total(self, name, mask=None):
+        """Sum of a numeric column, optionally over a boolean mask"""
+        values = self._cols[name][:self._n]
+        return float(values[mask].sum() if mask is not None else values.sum())
+
+    def destination_names(self, rows=None):
+        """Decoded destination names for all rows or the given row positions"""
+        codes = self._cols["destination"][:self._n]
+        if rows is not None:
+            codes = codes[rows]
+        return np.asarray(self.destinations, dtype=object)[codes]
+
+    def encode_destinations(self, names):
+        """Map destination names to dictionary codes, growing the dictionary as needed"""
+        if isinstance(names, str):
+            return self._destination_code(names)
+        names = np.asarray(names, dtype=object)
+        uniques, inverse = np.unique(names.astype(str), return_inverse=True)
+        codes = np.array([self._destination_code(str(name)) for name in uniques], dtype=np.int32)
+        return codes[inverse]
+
+    def _destination_code(self, name):
+        code = self._destination_codes.get(name)
+        if code is None:
+            code = len(self.destinations)
+            self.destinations.append(name)
+            self._destination_codes[name] = code
+        return code
+
+    def _reserve(self, size):
+        capacity = max(len(self._cols["id"]), 1)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name, col in self._cols.items():
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._n] = col[:self._n]
+            self._cols[name] = grown
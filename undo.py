@@ -0,0 +1,54 @@
+"""Undo/redo over immutable versions of application state"""
+from collections import deque
+
+UNDO_LIMIT = 100
+
+
+class History:
+    """Undo and redo stacks of immutable versions, each step with a label
+
+    Versions are never modified, so a step only holds a reference; with a
+    structurally shared version such as persistent.RecordTable, keeping a
+    step costs only the nodes that changed.
+    """
+
+    def __init__(self, version=None, limit=UNDO_LIMIT):
+        self.current = version
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+    def commit(self, version, label):
+        """Make version current as an undoable step; clears the redo stack"""
+        self._undo.append((self.current, label))
+        self.current = version
+        self._redo.clear()
+
+    def replace(self, version):
+        """Make version current without an undo step, e.g. after loading"""
+        self.current = version
+
+    def undo(self):
+        """Step back; returns the undone step's label, or None if there is nothing to undo"""
+        if not self._undo:
+            return None
+        previous, label = self._undo.pop()
+        self._redo.append((self.current, label))
+        self.current = previous
+        return label
+
+    def redo(self):
+        """Step forward again; returns the label, or None if there is nothing to redo"""
+        if not self._redo:
+            return None
+        following, label = self._redo.pop()
+        self._undo.append((self.current, label))
+        self.current = following
+        return label
+
+    @property
+    def undo_label(self):
+        return self._undo[-1][1] if self._undo else None
+
+    @property
+    def redo_label(self):
+        return self._redo[-1][1] if self._redo else None
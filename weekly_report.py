@@ -0,0 +1,148 @@
+"""Weekly summary, chart and table builders for the Streamlit tracker"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from forecasting import weekday
+
+# Most periods drawn by the history chart, and the size above which it uses WebGL
+HISTORY_POINTS = 2000
+WEBGL_POINTS = 1000
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def chart_data(week):
+    """Per-day frame of the days that were traveled"""
+    traveled_rows = np.flatnonzero(week['traveled'])
+    return pd.DataFrame({
+        'day': np.asarray(DAYS_OF_WEEK)[traveled_rows],
+        'km': week['distance'][traveled_rows],
+        'cost': week['cost'][traveled_rows],
+        'emission': week['emission'][traveled_rows]
+    })
+
+
+def distance_chart(week):
+    """Bar chart of daily distance"""
+    df = chart_data(week)
+    fig = px.bar(
+        df,
+        x='day',
+        y='km',
+        title='Daily Distance Traveled',
+        color='km',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+def cost_emission_chart(week):
+    """Dual-axis bar chart of daily cost and CO₂"""
+    df = chart_data(week)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df['day'],
+        y=df['cost'],
+        name='Cost (₹)',
+        marker_color='green',
+        yaxis='y'
+    ))
+    fig.add_trace(go.Bar(
+        x=df['day'],
+        y=df['emission'],
+        name='CO₂ Emission (g)',
+        marker_color='red',
+        yaxis='y2'
+    ))
+
+    fig.update_layout(
+        title='Daily Cost vs CO₂ Emissions',
+        yaxis=dict(title='Cost (₹)', side='left'),
+        yaxis2=dict(title='CO₂ Emission (g)', side='right', overlaying='y'),
+        barmode='group'
+    )
+    return fig
+
+
+def history_table(rollups):
+    """("Daily" | "Weekly" | "Monthly", rollup table) for the finest period within HISTORY_POINTS"""
+    for period, reduce in (("Daily", rollups.daily), ("Weekly", rollups.weekly), ("Monthly", rollups.monthly)):
+        table = reduce()
+        if len(table['period']) <= HISTORY_POINTS:
+            break
+    return period, table
+
+
+def history_chart(period, table):
+    """Line chart of distance per period over a whole history, from a Rollups table"""
+    trace = go.Scattergl if len(table['period']) > WEBGL_POINTS else go.Scatter
+    fig = go.Figure(trace(
+        x=table['period'],
+        y=table['distance_sum'],
+        customdata=np.column_stack([table['count'], table['distance_max']]),
+        hovertemplate='%{x}<br>%{y:g} km over %{customdata[0]} days<br>longest day %{customdata[1]:g} km',
+        mode='lines',
+        name='km',
+        line=dict(color='#2196f3')
+    ))
+    fig.update_layout(
+        title=f'{period} Distance History',
+        xaxis_title='Date',
+        yaxis_title='Distance (km)'
+    )
+    return fig
+
+
+def travel_log(week):
+    """Display frame for the detailed travel log"""
+    destinations = week.destination_names()
+    return pd.DataFrame({
+        'Day': DAYS_OF_WEEK,
+        'Traveled': np.where(week['traveled'], '✅ Yes', '❌ No'),
+        'Destination': np.where(destinations == '', '-', destinations),
+        'Distance (km)': week['distance'],
+        'Cost (₹)': week['cost'],
+        'CO₂ Emission (g)': week['emission']
+    })
+
+
+def history_log(page):
+    """Display frame for one page of the full history log, formatted column-wise"""
+    destinations = page['destination'].astype(str)
+    return pd.DataFrame({
+        'Date': np.datetime_as_string(page['date'], unit='D'),
+        'Day': np.asarray(DAYS_OF_WEEK)[weekday(page['date'].astype(np.int64))],
+        'Destination': np.where(destinations == '', '-', destinations),
+        'Distance (km)': page['distance'],
+        'Cost (₹)': page['cost'],
+        'CO₂ Emission (g)': page['emission']
+    })
+
+
+def top_destinations(places):
+    """Table of DestinationIndex.top() aggregates"""
+    return pd.DataFrame({
+        'Destination': [place['name'] for place in places],
+        'Visits': [place['visits'] for place in places],
+        'Typical km': [place['typical_km'] for place in places],
+        'Total km': [place['distance'] for place in places],
+        'Total Cost (₹)': [place['cost'] for place in places],
+        'Total CO₂ (g)': [place['emission'] for place in places]
+    })
+
+
+def summary_report(totals, user):
+    """One-row CSV summary of the week's totals for download"""
+    report_df = pd.DataFrame({
+        'User ': [user['name']],
+        'Vehicle': [user['vehicle']],
+        'City': [user['city']],
+        'Week Summary': [f"{totals['count']} days traveled"],
+        'Total Distance': [f"{totals['distance']:g} km"],
+        'Total Cost': [f"₹{totals['cost']:g}"],
+        'Total CO₂': [f"{totals['emission']:g}g"]
+    })
+    return report_df.to_csv(index=False)